@@ -12,32 +12,121 @@ Author: AI Assistant
 Version: 2.0 - Clean Rewrite with AccessibleName Support
 """
 
+import ctypes
+import hashlib
+import importlib.util
 import json
+import logging
+import logging.handlers
+import queue
 import subprocess
+import sys
+import threading
 import time
 import win32gui
 import win32con
 import win32process
 import win32api
+import win32event
+import atexit
 import os
-from typing import TypedDict, List, Dict, Any, Optional
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+from ctypes import wintypes
+from dataclasses import dataclass, field
+from typing import TypedDict, NamedTuple, List, Dict, Any, Optional, Sequence, Tuple
 
-# Optional imports with graceful fallback
-try:
-    import uiautomation as auto
-    UI_AUTOMATION_AVAILABLE = True
-    print("✅ UI Automation available")
-except ImportError:
-    UI_AUTOMATION_AVAILABLE = False
-    print("⚠️  Warning: uiautomation not available, using Win32 API only")
+# Console output is written by a background listener so the automation thread only enqueues records
+logger = logging.getLogger('desktop_automation')
+if not logger.handlers:
+    _log_queue: queue.Queue = queue.Queue()
+    _console_handler = logging.StreamHandler(sys.stdout)
+    _console_handler.setFormatter(logging.Formatter('%(message)s'))
+    _log_listener = logging.handlers.QueueListener(_log_queue, _console_handler)
+    _log_listener.start()
+    atexit.register(_log_listener.stop)  # flush pending records on exit
+    logger.addHandler(logging.handlers.QueueHandler(_log_queue))
+    # e.g. DESKTOP_AUTOMATION_LOG_LEVEL=WARNING for unattended runs
+    _level_name = os.environ.get('DESKTOP_AUTOMATION_LOG_LEVEL', 'INFO').upper()
+    logger.setLevel(getattr(logging, _level_name, logging.INFO))
+    logger.propagate = False
+
+# Optional imports with graceful fallback - the heavy ones are only imported on first use
+UI_AUTOMATION_AVAILABLE = importlib.util.find_spec('uiautomation') is not None
+if UI_AUTOMATION_AVAILABLE:
+    logger.info("✅ UI Automation available")
+else:
+    logger.warning("⚠️  Warning: uiautomation not available, using Win32 API only")
 
 try:
-    from openai import OpenAI
-    OPENAI_AVAILABLE = True
-    print("✅ OpenAI available for LLM fallback")
+    import numpy as np
+    NUMPY_AVAILABLE = True
 except ImportError:
-    OPENAI_AVAILABLE = False
-    print("⚠️  Warning: OpenAI not available, LLM fallback disabled")
+    NUMPY_AVAILABLE = False
+
+OPENAI_AVAILABLE = importlib.util.find_spec('openai') is not None
+if OPENAI_AVAILABLE:
+    logger.info("✅ OpenAI available for LLM fallback")
+else:
+    logger.warning("⚠️  Warning: OpenAI not available, LLM fallback disabled")
+
+_auto = None
+_openai_class = None
+
+
+def _get_auto():
+    """Import uiautomation on first use (it pulls in comtypes and is slow to load)"""
+    global _auto
+    if _auto is None:
+        import uiautomation
+        _auto = uiautomation
+    return _auto
+
+
+def _get_openai_class():
+    """Import the OpenAI client class on first use (httpx/pydantic are slow to load)"""
+    global _openai_class
+    if _openai_class is None:
+        from openai import OpenAI
+        _openai_class = OpenAI
+    return _openai_class
+
+
+# UIA property ids (UIA_*PropertyId), bound once instead of looked up per node
+_PID_BOUNDING_RECTANGLE = 30001
+_PID_CONTROL_TYPE = 30003
+_PID_LOCALIZED_CONTROL_TYPE = 30004
+_PID_NAME = 30005
+_PID_ACCESS_KEY = 30007
+_PID_IS_ENABLED = 30010
+_PID_AUTOMATION_ID = 30011
+_PID_CLASS_NAME = 30012
+_PID_HELP_TEXT = 30013
+_PID_IS_OFFSCREEN = 30022
+_PID_FRAMEWORK_ID = 30024
+_PID_LEGACY_NAME = 30092
+_PID_LEGACY_VALUE = 30093
+_PID_LEGACY_DESC = 30094
+_PROPERTY_CONDITION_IGNORE_CASE = 1  # PropertyConditionFlags_IgnoreCase
+
+# Property sets prefetched per node by the tree walks
+_SEARCH_PROPERTY_IDS = (_PID_AUTOMATION_ID, _PID_NAME, _PID_LEGACY_NAME, _PID_LEGACY_VALUE, _PID_CLASS_NAME,
+                        _PID_IS_OFFSCREEN)
+_COLLECT_PROPERTY_IDS = (
+    _PID_NAME, _PID_AUTOMATION_ID, _PID_CLASS_NAME, _PID_LEGACY_NAME, _PID_LEGACY_VALUE,
+    _PID_CONTROL_TYPE, _PID_LOCALIZED_CONTROL_TYPE, _PID_IS_ENABLED, _PID_IS_OFFSCREEN,
+    _PID_HELP_TEXT, _PID_ACCESS_KEY, _PID_LEGACY_DESC, _PID_BOUNDING_RECTANGLE,
+)
+
+
+# Tree depth searched/collected per UI framework (UIA FrameworkId of the top-level window).
+# Chromium/Electron nest the page many levels below the window; WinForms/Win32 dialogs are shallow.
+FRAMEWORK_DEPTHS = {'WinForm': 5, 'Win32': 5, 'WPF': 10, 'Chrome': 15}
+DEFAULT_FRAMEWORK_DEPTH = 10
+
+# Notepad's text area by window class: classic Edit child, or RichEditD2DPT inside NotepadTextBox (Windows 11)
+_NOTEPAD_EDIT_PATHS = (('Edit',), ('NotepadTextBox', 'RichEditD2DPT'))
+_TEXT_FIELD_TYPES = ('edit', 'text', 'document')
 
 
 # =============================================================================
@@ -52,6 +141,539 @@ class AutomationState(TypedDict):
     automation_success: bool
 
 
+class Element:
+    """A located UI element: a uiautomation control (kind 'ui_automation') or a Win32 hwnd (kind 'win32')"""
+    __slots__ = ('kind', 'ui', 'hwnd')
+    
+    def __init__(self, kind: str, ui: Any = None, hwnd: Optional[int] = None):
+        self.kind = kind
+        self.ui = ui
+        self.hwnd = hwnd
+    
+    def exists(self) -> bool:
+        """Whether the control/hwnd is still alive (a cheap check, no tree search)"""
+        try:
+            if self.kind == 'ui_automation':
+                return bool(self.ui.Exists(0, False))
+            return bool(win32gui.IsWindow(self.hwnd))
+        except Exception:
+            return False
+
+
+class CompiledStep(NamedTuple):
+    """An automation step normalized once before execution"""
+    action: str          # lowercased event_action_type
+    window: str
+    field: str
+    ftype: str
+    data: str
+    key: str             # SpecialKeyWithData
+    skip: Optional[str] = None  # name of the 'nan' placeholder field that makes the step a no-op
+
+
+# =============================================================================
+# COLLECTED ELEMENTS (LLM FALLBACK)
+# =============================================================================
+
+ELEMENT_COLUMNS = (
+    'name', 'automation_id', 'class_name', 'control_type', 'localized_control_type',
+    'is_enabled', 'is_visible', 'help_text', 'access_key', 'accessible_name',
+    'name_property', 'legacy_accessible_name', 'legacy_accessible_value',
+    'legacy_accessible_description', 'bounds',
+)
+
+# Weights for scoring collected rows against LLM-returned identifiers (search priority order)
+LLM_MATCH_WEIGHTS = {
+    'automation_id': 8, 'name': 4, 'accessible_name': 4, 'legacy_accessible_name': 2, 'class_name': 1,
+}
+LLM_MATCH_MIN_SCORE = 2  # a class_name-only hit is too ambiguous to act on
+
+# Kept for local matching but not worth their tokens in the prompt (name_property duplicates name)
+PROMPT_EXCLUDED_COLUMNS = frozenset({'name_property', 'bounds', 'is_enabled', 'is_visible', 'access_key'})
+
+
+@dataclass
+class CollectedElements:
+    """Structure-of-arrays snapshot of UI elements: one list per property column"""
+    columns: Dict[str, List[Any]] = field(default_factory=lambda: {c: [] for c in ELEMENT_COLUMNS})
+    controls: List[Any] = field(default_factory=list)  # live controls, parallel to the columns
+    exact_match: Any = None  # control whose Name/AutomationId equals the searched field, if one was seen
+    _hashes: Dict[str, Any] = field(default_factory=dict, repr=False)
+    
+    def __len__(self) -> int:
+        return len(self.controls)
+    
+    def append(self, ctrl: Any, **values: Any) -> None:
+        """Append one element; values must provide every column in ELEMENT_COLUMNS"""
+        self.controls.append(ctrl)
+        self._hashes.clear()
+        for column in ELEMENT_COLUMNS:
+            self.columns[column].append(values[column])
+    
+    def extend(self, other: 'CollectedElements') -> None:
+        """Append all elements of another snapshot"""
+        self.controls.extend(other.controls)
+        self._hashes.clear()
+        for column, values in self.columns.items():
+            values.extend(other.columns[column])
+    
+    def row(self, index: int) -> Dict[str, Any]:
+        """Reconstruct a single element as a dict"""
+        return {column: values[index] for column, values in self.columns.items()}
+    
+    def best_match(self, criteria: Dict[str, str]) -> int:
+        """Index of the row scoring highest against criteria (weighted exact matches), or -1"""
+        active = [(column, weight, criteria[column]) for column, weight in LLM_MATCH_WEIGHTS.items()
+                  if criteria.get(column)]
+        if not active or not len(self):
+            return -1
+        
+        if NUMPY_AVAILABLE:
+            scores = np.zeros(len(self), dtype=np.int32)
+            for column, weight, value in active:
+                hashes = self._hashes.get(column)
+                if hashes is None:
+                    hashes = np.fromiter((hash(v) for v in self.columns[column]), dtype=np.int64, count=len(self))
+                    self._hashes[column] = hashes
+                scores += (hashes == hash(value)) * weight
+            best = int(scores.argmax())
+            best_score = int(scores[best])
+        else:
+            scores = [sum(weight for column, weight, value in active if self.columns[column][i] == value)
+                      for i in range(len(self))]
+            best_score = max(scores)
+            best = scores.index(best_score)
+        
+        return best if best_score >= LLM_MATCH_MIN_SCORE else -1
+    
+    def to_table(self, exclude: frozenset = frozenset()) -> Dict[str, Any]:
+        """Compact {"columns": [...], "rows": [[...], ...]} form with all-empty and excluded columns dropped"""
+        names = [column for column, values in self.columns.items() if column not in exclude and any(values)]
+        rows = zip(range(len(self)), *(self.columns[c] for c in names))
+        return {'columns': ['index'] + names, 'rows': [list(row) for row in rows]}
+
+
+LLM_PROMPT_TEMPLATE = """I need to find a UI element in a Windows desktop application. Here are the details:
+
+TARGET ELEMENT:
+- Field Name: "{field_name}"
+- Field Type: "{field_type}"
+
+AVAILABLE UI ELEMENTS (with full accessibility properties):
+Table format: "columns" names the properties, each entry of "rows" is one element with values in column order.
+Columns that are empty for every element are omitted.
+{elements_json}
+
+TASK:
+Find the element that best matches "{field_name}". The field name might be stored in ANY of these properties:
+
+🔍 SEARCH PRIORITY (check ALL of these):
+1. automation_id (AutomationId property)
+2. name (Name property)
+3. accessible_name (AccessibleName property) ⭐ VERY IMPORTANT
+4. legacy_accessible_name (Legacy IAccessible Name) ⭐ IMPORTANT
+5. legacy_accessible_value (Legacy IAccessible Value)
+6. class_name (ClassName property)
+
+MATCHING STRATEGIES:
+- Exact match on ANY accessibility property
+- Partial match (case-insensitive) on accessibility properties
+- Control type compatibility
+- Contextual similarity
+
+RESPONSE FORMAT (JSON only):
+{{
+    "matched_element": {{
+        "index": 0,
+        "name": "exact_name_from_list",
+        "automation_id": "exact_automation_id_from_list",
+        "accessible_name": "exact_accessible_name_from_list",
+        "legacy_accessible_name": "exact_legacy_accessible_name_from_list",
+        "class_name": "exact_class_name_from_list",
+        "control_type": "exact_control_type_from_list"
+    }},
+    "confidence": 0.95,
+    "reasoning": "Brief explanation of match",
+    "matched_property": "name_of_property_that_matched"
+}}
+
+"index" must be the exact index value of the matched row.
+
+If no match: {{"matched_element": null, "confidence": 0.0, "reasoning": "No match found", "matched_property": null}}"""
+
+
+# =============================================================================
+# UI AUTOMATION HELPERS
+# =============================================================================
+
+class StructureChangeWatcher:
+    """Wakes a retry loop as soon as a window's UI subtree changes
+    
+    Falls back to a plain timed wait when the event handler cannot be registered.
+    """
+    
+    _handler_class = None
+    
+    def __init__(self, window):
+        self._event = threading.Event()
+        self._window = window
+        self._handler = None
+        try:
+            auto = _get_auto()
+            self._handler = self._create_handler_class()(self._event)
+            auto._AutomationClient.instance().IUIAutomation.AddStructureChangedEventHandler(
+                window.Element, auto.TreeScope.Subtree, None, self._handler)
+        except Exception:
+            self._handler = None
+    
+    @classmethod
+    def _create_handler_class(cls):
+        if cls._handler_class is None:
+            import comtypes
+            auto = _get_auto()
+            
+            class StructureChangedHandler(comtypes.COMObject):
+                _com_interfaces_ = [auto._AutomationClient.instance().UIAutomationCore.IUIAutomationStructureChangedEventHandler]
+                
+                def __init__(self, event):
+                    super().__init__()
+                    self._event = event
+                
+                def HandleStructureChangedEvent(self, sender, changeType, runtimeId):
+                    self._event.set()
+            
+            cls._handler_class = StructureChangedHandler
+        return cls._handler_class
+    
+    @property
+    def active(self) -> bool:
+        """Whether change events are actually being delivered"""
+        return self._handler is not None
+    
+    def wait(self, timeout: float) -> bool:
+        """Block until the subtree changes or timeout elapses; True if a change was seen"""
+        changed = self._event.wait(timeout)
+        self._event.clear()
+        return changed
+    
+    def close(self) -> None:
+        if self._handler is not None:
+            try:
+                _get_auto()._AutomationClient.instance().IUIAutomation.RemoveStructureChangedEventHandler(
+                    self._window.Element, self._handler)
+            except Exception:
+                pass
+            self._handler = None
+
+
+# id(control) -> (control, its children) for GetChildren results shared between walks
+ChildrenCache = Dict[int, Tuple[Any, List[Any]]]
+
+
+def _get_children(ctrl, children_cache: Optional[ChildrenCache] = None) -> List[Any]:
+    """ctrl.GetChildren(), memoized in children_cache when one is given
+    
+    Keyed by id(ctrl); each entry holds ctrl itself so the id cannot be recycled while cached.
+    """
+    if children_cache is None:
+        return ctrl.GetChildren()
+    entry = children_cache.get(id(ctrl))
+    if entry is None:
+        entry = children_cache[id(ctrl)] = (ctrl, ctrl.GetChildren())
+    return entry[1]
+
+
+def _safe_get(ctrl, property_id: int) -> str:
+    """Read a single UIA property as a string, '' when missing or unreadable"""
+    try:
+        value = ctrl.GetPropertyValue(property_id)
+        return str(value) if value else ''
+    except Exception:
+        return ''
+
+
+def _read_cached_properties(ctrl, cache_request, property_ids) -> Optional[List[Any]]:
+    """Fetch several UIA properties of ctrl in a single cross-process round trip"""
+    try:
+        cached = ctrl.Element.BuildUpdatedCache(cache_request)
+        return [cached.GetCachedPropertyValue(property_id) for property_id in property_ids]
+    except Exception:
+        return None
+
+
+def _init_worker_com() -> None:
+    """Thread pool initializer: join the worker to the MTA for the lifetime of the thread
+    
+    UIA elements created here are handed back to the caller thread, which the
+    multithreaded apartment allows without marshaling.
+    """
+    if UI_AUTOMATION_AVAILABLE:
+        import comtypes
+        try:
+            comtypes.CoInitializeEx(comtypes.COINIT_MULTITHREADED)
+        except OSError:
+            # comtypes was first imported on this thread and already made it an STA
+            comtypes.CoUninitialize()
+            comtypes.CoInitializeEx(comtypes.COINIT_MULTITHREADED)
+
+
+def _wait_until_ready(timeout: float = 1.0, interval: float = 0.05) -> bool:
+    """Wait until some control holds keyboard focus and the foreground window has drained its queue"""
+    deadline = time.perf_counter() + timeout
+    while True:
+        try:
+            if not UI_AUTOMATION_AVAILABLE or _get_auto().GetFocusedControl() is not None:
+                foreground = win32gui.GetForegroundWindow()
+                if foreground:
+                    remaining_ms = max(int((deadline - time.perf_counter()) * 1000), 1)
+                    return _wait_for_window_idle(foreground, remaining_ms)
+        except Exception:
+            pass  # focus is mid-transition
+        
+        if time.perf_counter() >= deadline:
+            return False
+        time.sleep(interval)
+
+
+# =============================================================================
+# WIN32 HELPERS
+# =============================================================================
+
+INPUT_MOUSE = 0
+INPUT_KEYBOARD = 1
+KEYEVENTF_KEYUP = 0x0002
+KEYEVENTF_UNICODE = 0x0004
+
+
+class MOUSEINPUT(ctypes.Structure):
+    _fields_ = (('dx', wintypes.LONG), ('dy', wintypes.LONG), ('mouseData', wintypes.DWORD),
+                ('dwFlags', wintypes.DWORD), ('time', wintypes.DWORD), ('dwExtraInfo', wintypes.WPARAM))
+
+
+class KEYBDINPUT(ctypes.Structure):
+    _fields_ = (('wVk', wintypes.WORD), ('wScan', wintypes.WORD), ('dwFlags', wintypes.DWORD),
+                ('time', wintypes.DWORD), ('dwExtraInfo', wintypes.WPARAM))
+
+
+class _INPUTUNION(ctypes.Union):
+    # MOUSEINPUT is the largest member, so it has to be here for sizeof(INPUT) to match user32
+    _fields_ = (('mi', MOUSEINPUT), ('ki', KEYBDINPUT))
+
+
+class INPUT(ctypes.Structure):
+    _fields_ = (('type', wintypes.DWORD), ('u', _INPUTUNION))
+
+
+class GUITHREADINFO(ctypes.Structure):
+    _fields_ = (('cbSize', wintypes.DWORD), ('flags', wintypes.DWORD), ('hwndActive', wintypes.HWND),
+                ('hwndFocus', wintypes.HWND), ('hwndCapture', wintypes.HWND), ('hwndMenuOwner', wintypes.HWND),
+                ('hwndMoveSize', wintypes.HWND), ('hwndCaret', wintypes.HWND), ('rcCaret', wintypes.RECT))
+
+
+# user32 bound once with explicit prototypes; SendInput is called directly on the input hot paths
+_user32 = ctypes.WinDLL('user32', use_last_error=True)
+_SendInput = _user32.SendInput
+_SendInput.argtypes = (wintypes.UINT, ctypes.POINTER(INPUT), ctypes.c_int)
+_SendInput.restype = wintypes.UINT
+_INPUT_SIZE = ctypes.sizeof(INPUT)
+# Byte offset of ki.wScan in an INPUT (little-endian WORD), and one unicode key down + key up
+_SCAN_OFFSET = INPUT.u.offset + KEYBDINPUT.wScan.offset
+_UNICODE_PAIR_TEMPLATE = b''.join(
+    bytes(INPUT(type=INPUT_KEYBOARD, u=_INPUTUNION(ki=KEYBDINPUT(dwFlags=flags))))
+    for flags in (KEYEVENTF_UNICODE, KEYEVENTF_UNICODE | KEYEVENTF_KEYUP))
+_SetCursorPos = _user32.SetCursorPos
+_SetCursorPos.argtypes = (ctypes.c_int, ctypes.c_int)
+_SetCursorPos.restype = wintypes.BOOL
+_GetForegroundWindow = _user32.GetForegroundWindow
+_GetForegroundWindow.argtypes = ()
+_GetForegroundWindow.restype = wintypes.HWND
+_SetForegroundWindow = _user32.SetForegroundWindow
+_SetForegroundWindow.argtypes = (wintypes.HWND,)
+_SetForegroundWindow.restype = wintypes.BOOL
+_GetAncestor = _user32.GetAncestor
+_GetAncestor.argtypes = (wintypes.HWND, wintypes.UINT)
+_GetAncestor.restype = wintypes.HWND
+_PostMessageW = _user32.PostMessageW
+_PostMessageW.argtypes = (wintypes.HWND, wintypes.UINT, wintypes.WPARAM, wintypes.LPARAM)
+_PostMessageW.restype = wintypes.BOOL
+_GetGUIThreadInfo = _user32.GetGUIThreadInfo
+_GetGUIThreadInfo.argtypes = (wintypes.DWORD, ctypes.POINTER(GUITHREADINFO))
+_GetGUIThreadInfo.restype = wintypes.BOOL
+
+
+# Reused backing store for SendInput batches; input is only injected from the automation thread
+_input_scratch = bytearray(64 * _INPUT_SIZE)
+
+
+def _input_slots(count: int) -> Tuple[Any, memoryview]:
+    """count zeroed INPUT slots over the scratch buffer (grown to the next power of two when short),
+    plus a byte view of them"""
+    global _input_scratch
+    size = count * _INPUT_SIZE
+    if len(_input_scratch) < size:
+        # Earlier views keep the old buffer alive, so it is replaced rather than resized
+        _input_scratch = bytearray(_INPUT_SIZE << (count - 1).bit_length())
+    inputs = (INPUT * count).from_buffer(_input_scratch)
+    ctypes.memset(ctypes.addressof(inputs), 0, size)
+    return inputs, memoryview(_input_scratch)[:size]
+
+
+def _send_unicode_text(text: str, then: Sequence[Tuple[int, int]] = ()) -> int:
+    """Type text into the focused window with a single SendInput call, returns events injected
+    
+    then: (virtual key, flags) events appended to the same batch, e.g. an Enter to confirm.
+    """
+    # UTF-16 code units, so characters outside the BMP go out as surrogate pairs
+    units = text.encode('utf-16-le')
+    count = len(units) // 2
+    if not count and not then:
+        return 0
+    
+    # Stamp the down/up template once per character, then drop the code units into every wScan
+    # with strided slice assignment - all of it runs in C, with no per-character Python loop
+    pair_size = len(_UNICODE_PAIR_TEMPLATE)
+    text_size = count * pair_size
+    inputs, buffer = _input_slots(2 * count + len(then))
+    buffer[:text_size] = _UNICODE_PAIR_TEMPLATE * count
+    low, high = units[0::2], units[1::2]
+    for event_offset in (_SCAN_OFFSET, _INPUT_SIZE + _SCAN_OFFSET):  # key down, key up
+        buffer[event_offset:text_size:pair_size] = low
+        buffer[event_offset + 1:text_size:pair_size] = high
+    
+    for i, (vk, flags) in enumerate(then, 2 * count):
+        slot = inputs[i]
+        slot.type = INPUT_KEYBOARD
+        slot.u.ki.wVk = vk
+        slot.u.ki.dwFlags = flags
+    
+    return _SendInput(len(inputs), inputs, _INPUT_SIZE)
+
+
+def _send_key_combination(modifier_keys: Sequence[int], vk_code: int) -> int:
+    """Press and release vk_code with modifiers held, as one SendInput call; returns events injected"""
+    # modifiers down, key down, key up, modifiers up in reverse order
+    releases = [(vk, KEYEVENTF_KEYUP) for vk in reversed(modifier_keys)]
+    sequence = [(vk, 0) for vk in modifier_keys] + [(vk_code, 0), (vk_code, KEYEVENTF_KEYUP)] + releases
+    
+    sent = 0
+    try:
+        sent = _send_virtual_keys(sequence)
+    finally:
+        # A partially injected batch (e.g. blocked by UIPI) must not leave a phantom Ctrl/Alt/Shift held
+        if sent < len(sequence) and releases:
+            _send_virtual_keys(releases)
+    return sent
+
+
+def _send_virtual_keys(sequence: List[Tuple[int, int]]) -> int:
+    """Inject (virtual key, flags) keyboard events with one SendInput call"""
+    inputs, _ = _input_slots(len(sequence))
+    for slot, (vk, flags) in zip(inputs, sequence):
+        slot.type = INPUT_KEYBOARD
+        slot.u.ki.wVk = vk
+        slot.u.ki.dwFlags = flags
+    
+    return _SendInput(len(inputs), inputs, _INPUT_SIZE)
+
+
+def _window_class(hwnd: int) -> str:
+    """Lowercased window class, with WinForms names like 'WindowsForms10.EDIT.app.0.x' reduced to 'edit'"""
+    class_name = win32gui.GetClassName(hwnd).lower()
+    if class_name.startswith('windowsforms10.'):
+        class_name = class_name.split('.')[1]
+    return class_name
+
+
+# SendInput never writes to its input, so the click batch is built once and replayed
+_LEFT_CLICK = (INPUT * 2)(*(INPUT(type=INPUT_MOUSE, u=_INPUTUNION(mi=MOUSEINPUT(dwFlags=flags)))
+                            for flags in (win32con.MOUSEEVENTF_LEFTDOWN, win32con.MOUSEEVENTF_LEFTUP)))
+
+
+def _send_left_click() -> int:
+    """Press and release the left button at the current cursor position with one SendInput call"""
+    return _SendInput(len(_LEFT_CLICK), _LEFT_CLICK, _INPUT_SIZE)
+
+
+def _focused_hwnd(hwnd: int) -> Optional[int]:
+    """Window holding keyboard focus in hwnd's GUI thread, or None"""
+    thread_id, _ = win32process.GetWindowThreadProcessId(hwnd)
+    info = GUITHREADINFO(cbSize=ctypes.sizeof(GUITHREADINFO))
+    if not _GetGUIThreadInfo(thread_id, ctypes.byref(info)):
+        return None
+    return info.hwndFocus
+
+
+def _wait_for_window_idle(hwnd: int, timeout_ms: int = 500) -> bool:
+    """Return once hwnd's thread has processed everything queued before now; False on timeout"""
+    try:
+        # WM_NULL does nothing, so its reply only means the window procedure got round to it
+        win32gui.SendMessageTimeout(hwnd, win32con.WM_NULL, 0, 0,
+                                    win32con.SMTO_BLOCK | win32con.SMTO_ABORTIFHUNG, timeout_ms)
+        return True
+    except win32gui.error:
+        return False
+
+
+def _find_top_level_window(window_name: str, hwnd_cache: Optional[Dict[str, int]] = None) -> Optional[int]:
+    """Find the first visible top-level window whose title contains window_name"""
+    target = window_name.lower()
+    if hwnd_cache is not None:
+        hwnd = hwnd_cache.get(target)
+        # The handle may have been recycled by another window, so re-check the title too
+        if (hwnd and win32gui.IsWindow(hwnd) and win32gui.IsWindowVisible(hwnd)
+                and target in win32gui.GetWindowText(hwnd).lower()):
+            return hwnd
+        hwnd_cache.pop(target, None)
+    
+    # An exact title match is a single lookup in user32
+    try:
+        hwnd = win32gui.FindWindow(None, window_name)
+    except win32gui.error:
+        hwnd = 0
+    if hwnd and win32gui.IsWindowVisible(hwnd):
+        if hwnd_cache is not None:
+            hwnd_cache[target] = hwnd
+        return hwnd
+    
+    # Walk the top-level z-order directly and stop at the first match
+    try:
+        hwnd = win32gui.FindWindowEx(0, 0, None, None)
+        while hwnd:
+            if win32gui.IsWindowVisible(hwnd) and target in win32gui.GetWindowText(hwnd).lower():
+                if hwnd_cache is not None:
+                    hwnd_cache[target] = hwnd
+                return hwnd
+            hwnd = win32gui.FindWindowEx(0, hwnd, None, None)
+    except win32gui.error:
+        pass  # FindWindowEx raises once the end of the z-order is reached
+    
+    return None
+
+
+def _find_notepad_edit(main_hwnd: int) -> Optional[int]:
+    """Handle of Notepad's text area, found by window class without walking the UI tree"""
+    for path in _NOTEPAD_EDIT_PATHS:
+        hwnd = main_hwnd
+        try:
+            for class_name in path:
+                hwnd = win32gui.FindWindowEx(hwnd, 0, class_name, None)
+                if not hwnd:
+                    break
+        except win32gui.error:
+            hwnd = 0
+        if hwnd:
+            return hwnd
+    return None
+
+
+def _find_first_match(target_lower: str, values: List[str]) -> int:
+    """Index of the first pre-lowercased value that partially matches target_lower, or -1"""
+    for i, value in enumerate(values):
+        if target_lower in value or value in target_lower:
+            return i
+    return -1
+
+
 # =============================================================================
 # WINDOW MANAGER CLASS
 # =============================================================================
@@ -61,55 +683,62 @@ class WindowManager:
     
     def __init__(self):
         self.launched_processes = []
+        self._hwnd_cache: Dict[str, int] = {}
     
     def launch_application(self, exe_path: str) -> Optional[subprocess.Popen]:
         """Launch the application if not already running"""
         try:
             if not os.path.exists(exe_path):
-                print(f"❌ Executable not found: {exe_path}")
+                logger.error("❌ Executable not found: %s", exe_path)
                 return None
             
-            print(f"🚀 Launching application: {exe_path}")
+            logger.info("🚀 Launching application: %s", exe_path)
             process = subprocess.Popen(exe_path)
             self.launched_processes.append(process)
             
-            # Wait for the process to start
-            time.sleep(3)
-            print(f"✅ Application launched successfully (PID: {process.pid})")
+            # Wait until the process has a message loop ready instead of a fixed delay
+            self._wait_for_input_idle(process.pid)
+            logger.info("✅ Application launched successfully (PID: %s)", process.pid)
             return process
             
         except Exception as e:
-            print(f"❌ Failed to launch application: {str(e)}")
+            logger.error("❌ Failed to launch application: %s", e)
             return None
     
+    def _wait_for_input_idle(self, pid: int, timeout_ms: int = 10000) -> None:
+        """Block until the process is idle waiting for user input (or timeout_ms elapses)"""
+        handle = None
+        try:
+            handle = win32api.OpenProcess(win32con.PROCESS_QUERY_INFORMATION | win32con.SYNCHRONIZE, False, pid)
+            result = win32event.WaitForInputIdle(handle, timeout_ms)
+            if result == 0xFFFFFFFF:  # WAIT_FAILED
+                raise win32api.error(result, 'WaitForInputIdle', 'wait failed')
+        except Exception:
+            # Console apps have no message pump to wait on - give them a short grace period
+            time.sleep(0.5)
+        finally:
+            if handle:
+                win32api.CloseHandle(handle)
+    
     def activate_window(self, window_name: str) -> bool:
         """Activate window by name"""
         try:
-            print(f"🪟 Searching for window: {window_name}")
+            logger.info("🪟 Searching for window: %s", window_name)
             
-            def enum_windows_callback(hwnd, windows):
-                if win32gui.IsWindowVisible(hwnd):
-                    title = win32gui.GetWindowText(hwnd)
-                    if window_name.lower() in title.lower():
-                        windows.append(hwnd)
-                return True
-            
-            windows = []
-            win32gui.EnumWindows(enum_windows_callback, windows)
+            hwnd = _find_top_level_window(window_name, self._hwnd_cache)
             
-            if windows:
-                hwnd = windows[0]
+            if hwnd:
                 win32gui.SetForegroundWindow(hwnd)
                 win32gui.ShowWindow(hwnd, win32con.SW_RESTORE)
-                time.sleep(0.5)
-                print(f"✅ Activated window: {window_name}")
+                _wait_for_window_idle(hwnd)  # returns as soon as the restore/activation is processed
+                logger.info("✅ Activated window: %s", window_name)
                 return True
             else:
-                print(f"❌ Window not found: {window_name}")
+                logger.error("❌ Window not found: %s", window_name)
                 return False
                 
         except Exception as e:
-            print(f"❌ Error activating window: {str(e)}")
+            logger.error("❌ Error activating window: %s", e)
             return False
 
 
@@ -120,50 +749,198 @@ class WindowManager:
 class ElementDetector:
     """Three-tier element detection with full AccessibleName support"""
     
-    def __init__(self, openai_api_key: Optional[str] = None, openai_model: str = "gpt-4"):
+    def __init__(self, openai_api_key: Optional[str] = None, openai_model: str = "gpt-4o-mini",
+                 max_collected_elements: int = 500, collection_timeout_s: float = 2.0):
         self.timeout = 30
         self.openai_client = None
         self.openai_model = openai_model
+        self.max_collected_elements = max_collected_elements
+        self.collection_timeout_s = collection_timeout_s
+        self._hwnd_cache: Dict[str, int] = {}
+        self._window_cache: Dict[str, Tuple[Any, float]] = {}
+        self.window_cache_ttl = 30.0
+        self.collection_workers = 8
+        self._prompt_cache: Dict[Tuple[str, int], str] = {}
+        self._framework_cache: Dict[str, Tuple[str, int]] = {}
+        self._element_cache: Dict[Tuple[str, str, str], Element] = {}
+        # The element-prefetch worker reads and writes _element_cache alongside the caller thread
+        self._element_cache_lock = threading.Lock()
+        self._llm_cache: Dict[str, Dict[str, Any]] = {}  # sha256(prompt) -> parsed response
+        # The UIA walk runs here while the caller thread does the Win32 pass; two workers so an
+        # abandoned slow walk does not hold up the next search
+        self._uia_pool = ThreadPoolExecutor(max_workers=2, thread_name_prefix='uia-tier',
+                                            initializer=_init_worker_com) if UI_AUTOMATION_AVAILABLE else None
+        self.uia_grace_s = 0.5  # how long a Win32 hit waits for the (preferred) UIA result
         
         if OPENAI_AVAILABLE and openai_api_key:
-            self.openai_client = OpenAI(api_key=openai_api_key)
-            print("🤖 LLM fallback enabled with OpenAI")
+            self.openai_client = _get_openai_class()(api_key=openai_api_key)
+            logger.info("🤖 LLM fallback enabled with OpenAI")
         elif openai_api_key and not OPENAI_AVAILABLE:
-            print("⚠️  Warning: OpenAI API key provided but openai package not installed")
+            logger.warning("⚠️  Warning: OpenAI API key provided but openai package not installed")
     
-    def find_element(self, window_name: str, field_name: str, field_type: str, timeout: int = 30) -> Optional[Any]:
-        """Find element using three-tier detection strategy with accessibility support"""
-        print(f"🔍 Looking for element: '{field_name}' (type: {field_type}) in window: '{window_name}'")
+    def find_element(self, window_name: str, field_name: str, field_type: str, timeout: int = 30,
+                     include_offscreen: bool = False, initial_delay: float = 0.2,
+                     max_delay: float = 2.0) -> Optional[Element]:
+        """Find element using three-tier detection strategy with accessibility support
+        
+        Offscreen subtrees (collapsed panels, hidden menus) are skipped unless
+        include_offscreen is set, e.g. for tray icons. Misses are retried with
+        exponential backoff from initial_delay up to max_delay seconds.
+        """
+        logger.info("🔍 Looking for element: '%s' (type: %s) in window: '%s'", field_name, field_type, window_name)
         
+        # Steps often target the same control again - reuse it while it is still alive
+        cache_key = (window_name, field_name, field_type)
+        element = self._cached_element(cache_key)
+        if element is not None:
+            logger.info("✅ Reusing cached element: %s", field_name)
+            return element
+        
+        element = self._find_element_uncached(window_name, field_name, field_type, timeout,
+                                              include_offscreen, initial_delay, max_delay)
+        self._remember(cache_key, element)
+        return element
+    
+    def _remember(self, cache_key: Tuple[str, str, str], element: Optional[Element]) -> None:
+        """Store a found element for later steps against the same (window, field, type)"""
+        if element is not None:
+            with self._element_cache_lock:
+                if len(self._element_cache) >= 256:
+                    self._element_cache.clear()
+                self._element_cache[cache_key] = element
+    
+    def invalidate(self, window_name: Optional[str] = None) -> None:
+        """Drop cached elements (and the cached window) for window_name, or everything when None"""
+        if window_name is None:
+            with self._element_cache_lock:
+                self._element_cache.clear()
+            self._window_cache.clear()
+            return
+        with self._element_cache_lock:
+            for key in [key for key in self._element_cache if key[0] == window_name]:
+                del self._element_cache[key]
+        self._window_cache.pop(window_name, None)
+    
+    def _cached_element(self, cache_key: Tuple[str, str, str]) -> Optional[Element]:
+        """Cached element for cache_key if its control/hwnd still exists, else None (and evict it)"""
+        with self._element_cache_lock:
+            element = self._element_cache.get(cache_key)
+        if element is None:
+            return None
+        # exists() is a cross-process call, so it runs outside the lock; the other thread may
+        # already have evicted or replaced the entry by the time it returns
+        if not element.exists():
+            with self._element_cache_lock:
+                if self._element_cache.get(cache_key) is element:
+                    del self._element_cache[cache_key]
+            return None
+        return element
+    
+    def _find_element_uncached(self, window_name: str, field_name: str, field_type: str, timeout: int,
+                               include_offscreen: bool, initial_delay: float, max_delay: float) -> Optional[Element]:
+        """The three-tier search behind find_element's element cache"""
+        target_lower = field_name.lower()  # lowercased once, threaded through every tier
+        main_hwnd = None
+        watcher = None
+        children_cache: ChildrenCache = {}
+        delay = initial_delay
         start_time = time.time()
-        while time.time() - start_time < timeout:
-            # Tier 1: UI Automation (Primary) - with accessibility support
-            if UI_AUTOMATION_AVAILABLE:
-                element = self._find_with_ui_automation(window_name, field_name, field_type)
-                if element:
-                    print(f"✅ Found element with UI Automation: {field_name}")
-                    return element
-            
-            # Tier 2: Win32 API (Fallback)
-            element = self._find_with_win32_api(window_name, field_name, field_type)
-            if element:
-                print(f"✅ Found element with Win32 API: {field_name}")
-                return element
-            
-            time.sleep(0.5)  # Wait before retrying
+        try:
+            while time.time() - start_time < timeout:
+                # Each retry sees a fresh tree; within one pass GetChildren results are shared
+                children_cache = {}
+                
+                # Tier 1: UI Automation (Primary) - with accessibility support, walked on a worker
+                # so a slow tree cannot hold back the Win32 pass below
+                uia_future = None
+                if self._uia_pool is not None:
+                    uia_future = self._uia_pool.submit(self._find_with_ui_automation, window_name, field_name,
+                                                       field_type, include_offscreen, target_lower, children_cache)
+                
+                # Tier 2: Win32 API (Fallback) - resolve the window once, not per retry
+                if not main_hwnd:
+                    main_hwnd = _find_top_level_window(window_name, self._hwnd_cache)
+                win32_element = self._find_with_win32_api(window_name, field_name, field_type, main_hwnd, target_lower)
+                
+                # UIA still wins when both find something; a Win32 hit only waits briefly for it,
+                # and a miss waits no longer than the search timeout allows
+                if uia_future is not None:
+                    remaining = max(timeout - (time.time() - start_time), 0)
+                    try:
+                        element = uia_future.result(
+                            timeout=min(self.uia_grace_s, remaining) if win32_element else remaining)
+                    except FutureTimeoutError:
+                        element = None  # the walk finishes in the background; its result is dropped
+                    except Exception:
+                        element = None
+                    if element:
+                        logger.info("✅ Found element with UI Automation: %s", field_name)
+                        return element
+                
+                if win32_element:
+                    logger.info("✅ Found element with Win32 API: %s", field_name)
+                    return win32_element
+                
+                # Wait before retrying - wake early when the window's UI tree changes
+                if watcher is None and UI_AUTOMATION_AVAILABLE:
+                    window = self._find_window(window_name)
+                    if window:
+                        watcher = StructureChangeWatcher(window)
+                if watcher is not None:
+                    changed = watcher.wait(delay)
+                else:
+                    time.sleep(delay)
+                # Transient not-ready states resolve on the short waits; steady misses stop re-walking so often
+                delay = min(delay * 2, max_delay)
+                # The last pass's children stay usable for the LLM tier only if the tree provably did not change
+                if watcher is None or not watcher.active or changed:
+                    children_cache = {}
+        finally:
+            if watcher is not None:
+                watcher.close()
         
         # Tier 3: LLM Fallback (Last resort) - with accessibility support
         if self.openai_client and UI_AUTOMATION_AVAILABLE:
-            print(f"🤖 Trying LLM fallback for element: {field_name}")
-            element = self._find_with_llm_fallback(window_name, field_name, field_type)
+            logger.info("🤖 Trying LLM fallback for element: %s", field_name)
+            element = self._find_with_llm_fallback(window_name, field_name, field_type, include_offscreen,
+                                                   children_cache, target_lower)
             if element:
-                print(f"✅ Found element with LLM fallback: {field_name}")
+                logger.info("✅ Found element with LLM fallback: %s", field_name)
                 return element
         
-        print(f"❌ Element not found after {timeout} seconds: {field_name}")
+        logger.error("❌ Element not found after %s seconds: %s", timeout, field_name)
         return None
     
-    def _find_with_ui_automation(self, window_name: str, field_name: str, field_type: str) -> Optional[Any]:
+    def probe_element(self, window_name: str, field_name: str, field_type: str,
+                      include_offscreen: bool = False) -> Optional[Element]:
+        """Single quiet pass of the UI Automation and Win32 tiers - no retry loop, no LLM
+        
+        Used to resolve upcoming steps ahead of time from a worker thread. Shares
+        find_element's element cache in both directions.
+        """
+        cache_key = (window_name, field_name, field_type)
+        element = self._cached_element(cache_key)
+        if element is not None:
+            return element
+        
+        target_lower = field_name.lower()
+        try:
+            element = None
+            if UI_AUTOMATION_AVAILABLE:
+                element = self._find_with_ui_automation(window_name, field_name, field_type,
+                                                        include_offscreen, target_lower)
+            if not element:
+                main_hwnd = _find_top_level_window(window_name, self._hwnd_cache)
+                element = self._find_with_win32_api(window_name, field_name, field_type, main_hwnd, target_lower)
+        except Exception:
+            return None
+        self._remember(cache_key, element)
+        return element
+    
+    def _find_with_ui_automation(self, window_name: str, field_name: str, field_type: str,
+                                 include_offscreen: bool = False,
+                                 target_lower: Optional[str] = None,
+                                 children_cache: Optional[ChildrenCache] = None) -> Optional[Element]:
         """Find element using UI Automation with full accessibility support"""
         try:
             if not UI_AUTOMATION_AVAILABLE:
@@ -174,174 +951,236 @@ class ElementDetector:
             if not window:
                 return None
             
+            # Notepad's text area has a fixed window class - one FindWindowEx instead of a tree walk
+            if 'notepad' in window_name.lower() and any(t in field_type.lower() for t in _TEXT_FIELD_TYPES):
+                edit_hwnd = _find_notepad_edit(window.NativeWindowHandle)
+                if edit_hwnd:
+                    return Element('ui_automation', ui=_get_auto().ControlFromHandle(edit_hwnd))
+            
             # Comprehensive search with ALL accessibility properties
-            element = self._search_element_comprehensive(window, field_name)
+            _, max_depth = self._get_framework_strategy(window_name, window)
+            element = self._search_element_comprehensive(window, field_name, max_depth=max_depth,
+                                                         include_offscreen=include_offscreen,
+                                                         target_lower=target_lower, children_cache=children_cache)
             if element:
-                return {'type': 'ui_automation', 'element': element}
+                return Element('ui_automation', ui=element)
             
             return None
             
         except Exception as e:
-            print(f"⚠️  UI Automation search failed: {str(e)}")
+            logger.warning("⚠️  UI Automation search failed: %s", e)
             return None
     
     def _find_window(self, window_name: str):
-        """Find window using multiple strategies"""
-        # Method 1: Direct name match
+        """Find window using multiple strategies, memoized for window_cache_ttl seconds"""
+        cached = self._window_cache.get(window_name)
+        if cached is not None:
+            window, resolved_at = cached
+            try:
+                if time.time() - resolved_at < self.window_cache_ttl and window.Exists(0, False):
+                    return window
+            except:
+                pass
+            self._window_cache.pop(window_name, None)  # a UIA worker may have evicted it already
+        
+        window = self._resolve_window(window_name)
+        if window is not None:
+            self._window_cache[window_name] = (window, time.time())
+        return window
+    
+    def _get_framework_strategy(self, window_name: str, window) -> Tuple[str, int]:
+        """(framework id, tree depth) for the window, detected once per window name"""
+        strategy = self._framework_cache.get(window_name)
+        if strategy is None:
+            framework = _safe_get(window, _PID_FRAMEWORK_ID)
+            # Electron/Chromium hosts sometimes report an empty id - their window class gives them away
+            if not framework and _safe_get(window, _PID_CLASS_NAME).startswith('Chrome_WidgetWin'):
+                framework = 'Chrome'
+            strategy = (framework, FRAMEWORK_DEPTHS.get(framework, DEFAULT_FRAMEWORK_DEPTH))
+            if len(self._framework_cache) >= 64:
+                self._framework_cache.clear()
+            self._framework_cache[window_name] = strategy
+        return strategy
+    
+    def _resolve_window(self, window_name: str):
+        """Resolve window among the desktop's top-level windows, filtered natively by UIA"""
+        auto = _get_auto()
+        
+        # Method 0: the Win32 tier's handle cache - one lookup shared by both tiers
         try:
-            window = auto.WindowControl(searchDepth=1, Name=window_name)
-            if window.Exists(0, False):
-                return window
+            hwnd = _find_top_level_window(window_name, self._hwnd_cache)
+            if hwnd:
+                return auto.ControlFromHandle(hwnd)
         except:
             pass
         
-        # Method 2: Search through all windows
         try:
-            desktop = auto.GetRootControl()
-            windows = desktop.GetChildren()
-            for w in windows:
-                try:
-                    if (hasattr(w, 'Name') and w.Name and 
-                        window_name.lower() in w.Name.lower() and
-                        hasattr(w, 'ControlType') and
-                        w.ControlType == auto.ControlType.WindowControl):
-                        return w
-                except:
-                    continue
+            uia = auto._AutomationClient.instance().IUIAutomation
+            root = auto.GetRootControl().Element
+            is_window = uia.CreatePropertyCondition(_PID_CONTROL_TYPE, auto.ControlType.WindowControl)
+        except:
+            return None
+        
+        # Method 1: Direct name match, evaluated by the UIA core in one call
+        try:
+            element = root.FindFirst(auto.TreeScope.Children,
+                                     uia.CreateAndCondition(is_window, uia.CreatePropertyCondition(_PID_NAME, window_name)))
+            if element:
+                return auto.Control.CreateControlFromElement(element)
+        except:
+            pass
+        
+        # Method 2: Partial name match - only windows come back, their names prefetched with them
+        try:
+            window_lower = window_name.lower()
+            windows = root.FindAllBuildCache(auto.TreeScope.Children, is_window,
+                                             self._create_cache_request((_PID_NAME,)))
+            for i in range(windows.Length if windows else 0):
+                element = windows.GetElement(i)
+                name = element.CachedName
+                if name and window_lower in name.lower():
+                    return auto.Control.CreateControlFromElement(element)
         except:
             pass
         
         return None
     
-    def _search_element_comprehensive(self, window, field_name: str, max_depth: int = 5):
-        """Comprehensive element search with ALL accessibility properties"""
-        def search_recursive(ctrl, target_name, current_depth=0):
-            if current_depth >= max_depth:
-                return None
+    def _find_first_native(self, root, property_id, value: str, include_offscreen: bool = False):
+        """Let the UIA COM server walk the subtree for an exact property match
+        
+        property_id may be a tuple of ids, in which case any of them matching is enough.
+        Offscreen controls are skipped unless include_offscreen is set. The whole subtree
+        is searched; there is no depth limit on this path.
+        """
+        try:
+            auto = _get_auto()
+            uia = auto._AutomationClient.instance().IUIAutomation
+            property_ids = property_id if isinstance(property_id, tuple) else (property_id,)
+            condition = uia.CreatePropertyCondition(property_ids[0], value)
+            for other_id in property_ids[1:]:
+                condition = uia.CreateOrCondition(condition, uia.CreatePropertyCondition(other_id, value))
+            if not include_offscreen:
+                condition = uia.CreateAndCondition(condition, uia.CreatePropertyCondition(_PID_IS_OFFSCREEN, False))
+            element = root.Element.FindFirst(auto.TreeScope.Subtree, condition)
+            if element:
+                return auto.Control.CreateControlFromElement(element)
+        except:
+            pass
+        return None
+    
+    def _create_cache_request(self, property_ids):
+        """Build a UIA cache request that prefetches property_ids in one round trip"""
+        cache_request = _get_auto()._AutomationClient.instance().IUIAutomation.CreateCacheRequest()
+        for property_id in property_ids:
+            cache_request.AddProperty(property_id)
+        return cache_request
+    
+    def _search_element_comprehensive(self, window, field_name: str, max_depth: int = 5,
+                                      include_offscreen: bool = False, target_lower: Optional[str] = None,
+                                      children_cache: Optional[ChildrenCache] = None):
+        """Comprehensive element search with ALL accessibility properties (breadth-first)"""
+        # Exact AutomationId / Name matches are resolved natively in one OR-condition COM call
+        ctrl = self._find_first_native(window, (_PID_AUTOMATION_ID, _PID_NAME), field_name, include_offscreen)
+        if ctrl:
+            return ctrl
+        
+        # Manual walk only for partial matches and LegacyIAccessible properties
+        target_name = field_name
+        if target_lower is None:
+            target_lower = field_name.lower()
+        
+        property_ids = _SEARCH_PROPERTY_IDS
+        cache_request = self._create_cache_request(property_ids)
+        
+        def is_visible(values) -> bool:
+            return include_offscreen or not values[-1]
+        
+        def matches(values, ctrl) -> bool:
+            aid, name, legacy_name, legacy_value = (str(value) if value else '' for value in values[:4])
+            acc = getattr(ctrl, 'AccessibleName', None) or ''
+            
+            # Standard + accessibility property checks (NameProperty resolves to .Name)
+            if target_name in (aid, name, acc):
+                return True
+            
+            accessibility_values = [value.lower() for value in (name, acc) if value]
             
+            # Legacy IAccessible properties only when the fast attributes are empty
+            if not accessibility_values:
+                if target_name in (legacy_name, legacy_value):
+                    return True
+                if legacy_name:
+                    accessibility_values.append(legacy_name.lower())
+            
+            # Check partial matches
+            return _find_first_match(target_lower, accessibility_values) >= 0
+        
+        # One pass tests every property per node; children are only enumerated once the node failed
+        class_match = None
+        queue = deque([(window, 0)])
+        while queue:
+            ctrl, depth = queue.popleft()
             try:
-                # Standard property checks
-                if hasattr(ctrl, 'AutomationId') and ctrl.AutomationId == target_name:
-                    return ctrl
-                if hasattr(ctrl, 'Name') and ctrl.Name == target_name:
-                    return ctrl
-                
-                # Accessibility property checks - THE KEY ENHANCEMENT!
-                if hasattr(ctrl, 'AccessibleName') and ctrl.AccessibleName == target_name:
-                    return ctrl
-                
-                # Advanced accessibility checks via GetPropertyValue
-                try:
-                    name_prop = ctrl.GetPropertyValue(auto.PropertyId.NameProperty)
-                    if name_prop and str(name_prop) == target_name:
+                # All properties arrive in one BuildUpdatedCache round trip
+                values = _read_cached_properties(ctrl, cache_request, property_ids)
+                if values is not None:
+                    # Offscreen subtrees cannot hold the user's target - prune them whole
+                    if depth > 0 and not is_visible(values):
+                        continue
+                    if matches(values, ctrl):
                         return ctrl
-                except:
-                    pass
-                
-                try:
-                    legacy_name = ctrl.GetPropertyValue(auto.PropertyId.LegacyIAccessibleNameProperty)
-                    if legacy_name and str(legacy_name) == target_name:
-                        return ctrl
-                except:
-                    pass
-                
-                try:
-                    legacy_value = ctrl.GetPropertyValue(auto.PropertyId.LegacyIAccessibleValueProperty)
-                    if legacy_value and str(legacy_value) == target_name:
-                        return ctrl
-                except:
-                    pass
-                
-                # Partial matching for accessibility properties
-                accessibility_values = []
-                
-                if hasattr(ctrl, 'Name') and ctrl.Name:
-                    accessibility_values.append(ctrl.Name)
-                if hasattr(ctrl, 'AccessibleName') and ctrl.AccessibleName:
-                    accessibility_values.append(ctrl.AccessibleName)
-                
-                try:
-                    name_prop = ctrl.GetPropertyValue(auto.PropertyId.NameProperty)
-                    if name_prop:
-                        accessibility_values.append(str(name_prop))
-                except:
-                    pass
-                
-                try:
-                    legacy_name = ctrl.GetPropertyValue(auto.PropertyId.LegacyIAccessibleNameProperty)
-                    if legacy_name:
-                        accessibility_values.append(str(legacy_name))
-                except:
-                    pass
-                
-                # Check partial matches
-                for value in accessibility_values:
-                    if target_name.lower() in value.lower() or value.lower() in target_name.lower():
-                        return ctrl
-                
-                # Search children recursively
-                children = ctrl.GetChildren()
-                for child in children:
-                    result = search_recursive(child, target_name, current_depth + 1)
-                    if result:
-                        return result
-                        
+                    # An exact ClassName hit is the weakest signal - kept only if nothing better turns up
+                    if class_match is None and depth > 0 and values[4] == target_name:
+                        class_match = ctrl
+                if depth + 1 < max_depth:
+                    queue.extend((child, depth + 1) for child in _get_children(ctrl, children_cache))
             except:
                 pass
-            
-            return None
         
-        return search_recursive(window, field_name)
+        return class_match
     
-    def _find_with_win32_api(self, window_name: str, field_name: str, field_type: str) -> Optional[Any]:
+    def _find_with_win32_api(self, window_name: str, field_name: str, field_type: str,
+                             main_hwnd: Optional[int] = None, target_lower: Optional[str] = None) -> Optional[Element]:
         """Find element using Win32 API"""
         try:
-            # Find the main window
-            def enum_windows_callback(hwnd, windows):
-                if win32gui.IsWindowVisible(hwnd):
-                    title = win32gui.GetWindowText(hwnd)
-                    if window_name.lower() in title.lower():
-                        windows.append(hwnd)
-                return True
-            
-            windows = []
-            win32gui.EnumWindows(enum_windows_callback, windows)
-            
-            if not windows:
+            # Find the main window unless the caller already resolved it
+            if not main_hwnd:
+                main_hwnd = _find_top_level_window(window_name, self._hwnd_cache)
+            if not main_hwnd:
                 return None
             
-            main_hwnd = windows[0]
-            
             # Find child window/control
-            element_hwnd = self._find_child_window(main_hwnd, field_name)
+            element_hwnd = self._find_child_window(main_hwnd, field_name, target_lower)
             
             if element_hwnd:
-                return {'type': 'win32', 'hwnd': element_hwnd}
+                return Element('win32', hwnd=element_hwnd)
             
             return None
             
         except Exception as e:
-            print(f"⚠️  Win32 API search failed: {str(e)}")
+            logger.warning("⚠️  Win32 API search failed: %s", e)
             return None
     
-    def _find_child_window(self, parent_hwnd: int, field_name: str) -> Optional[int]:
+    def _find_child_window(self, parent_hwnd: int, field_name: str, target_lower: Optional[str] = None) -> Optional[int]:
         """Find child window by various properties"""
         try:
             found_hwnd = None
+            # Case-folded once here; the callback only folds the per-child strings
+            needle = (target_lower or field_name).casefold()
             
             def enum_child_callback(hwnd, param):
                 nonlocal found_hwnd
                 
                 # Try by window text
                 text = win32gui.GetWindowText(hwnd)
-                if text and field_name.lower() in text.lower():
+                if text and needle in text.casefold():
                     found_hwnd = hwnd
                     return False
                 
                 # Try by class name
                 try:
                     class_name = win32gui.GetClassName(hwnd)
-                    if class_name and field_name.lower() in class_name.lower():
+                    if class_name and needle in class_name.casefold():
                         found_hwnd = hwnd
                         return False
                 except:
@@ -353,25 +1192,35 @@ class ElementDetector:
             return found_hwnd
             
         except Exception as e:
-            print(f"⚠️  Child window search failed: {str(e)}")
+            logger.warning("⚠️  Child window search failed: %s", e)
             return None
     
-    def _find_with_llm_fallback(self, window_name: str, field_name: str, field_type: str) -> Optional[Any]:
+    def _find_with_llm_fallback(self, window_name: str, field_name: str, field_type: str,
+                                include_offscreen: bool = False,
+                                children_cache: Optional[ChildrenCache] = None,
+                                target_lower: Optional[str] = None) -> Optional[Element]:
         """Use LLM to analyze all UI elements with accessibility support"""
         try:
             if not self.openai_client or not UI_AUTOMATION_AVAILABLE:
                 return None
             
-            print("📊 Collecting all UI elements (including accessibility) for LLM analysis...")
+            logger.info("📊 Collecting all UI elements (including accessibility) for LLM analysis...")
             
             # Get all UI elements with accessibility properties
-            all_elements = self._collect_all_ui_elements(window_name)
+            # One children cache spans the collection and the response lookup (and the last search pass)
+            if children_cache is None:
+                children_cache = {}
+            all_elements = self._collect_all_ui_elements(window_name, include_offscreen, children_cache,
+                                                         field_name=field_name, target_lower=target_lower)
+            if all_elements.exact_match is not None:
+                logger.info("✅ Exact match seen while collecting - skipping the LLM query")
+                return Element('ui_automation', ui=all_elements.exact_match)
             if not all_elements:
-                print("❌ No UI elements found for LLM analysis")
+                logger.error("❌ No UI elements found for LLM analysis")
                 return None
             
             # Create enhanced prompt for LLM
-            prompt = self._create_llm_prompt(field_name, field_type, all_elements)
+            prompt = self._create_llm_prompt(field_name, field_type, all_elements, window_name)
             
             # Get LLM response
             llm_response = self._query_llm(prompt)
@@ -379,182 +1228,227 @@ class ElementDetector:
                 return None
             
             # Find element based on LLM response
-            return self._find_element_from_llm_response(llm_response, window_name)
+            return self._find_element_from_llm_response(llm_response, window_name, all_elements, children_cache)
             
         except Exception as e:
-            print(f"❌ LLM fallback failed: {str(e)}")
+            logger.error("❌ LLM fallback failed: %s", e)
             return None
     
-    def _collect_all_ui_elements(self, window_name: str) -> List[Dict[str, Any]]:
-        """Collect all UI elements with comprehensive accessibility properties"""
+    def _collect_all_ui_elements(self, window_name: str, include_offscreen: bool = False,
+                                 children_cache: Optional[ChildrenCache] = None,
+                                 min_depth: int = 1, max_depth: Optional[int] = None,
+                                 field_name: str = '', target_lower: Optional[str] = None) -> CollectedElements:
+        """Collect all UI elements with comprehensive accessibility properties
+        
+        Only elements between min_depth and max_depth (default: per framework) are kept;
+        depth 0 is the window itself, which is never the target. When field_name is given,
+        the walk stops at the first element whose AutomationId or Name equals it and that
+        control is returned as exact_match.
+        """
         try:
+            auto = _get_auto()
             window = self._find_window(window_name)
             if not window:
-                return []
+                return CollectedElements()
             
-            elements = []
+            property_ids = _COLLECT_PROPERTY_IDS
+            if max_depth is None:
+                _, max_depth = self._get_framework_strategy(window_name, window)
+            if target_lower is None:
+                target_lower = field_name.lower()
+            exact_hits = []  # shared by the walker threads; list.append is atomic
             
-            def collect_element_info(ctrl, depth):
+            def collect_element_info(ctrl, depth, elements, cache_request) -> bool:
+                """Collect ctrl into elements; returns whether its children should be walked"""
                 try:
-                    if depth > 10:  # Limit recursion depth
-                        return
-                    
-                    # Basic element info
-                    element_info = {
-                        'name': getattr(ctrl, 'Name', ''),
-                        'automation_id': getattr(ctrl, 'AutomationId', ''),
-                        'class_name': getattr(ctrl, 'ClassName', ''),
-                        'control_type': str(getattr(ctrl, 'ControlType', '')),
-                        'localized_control_type': getattr(ctrl, 'LocalizedControlType', ''),
-                        'is_enabled': getattr(ctrl, 'IsEnabled', False),
-                        'is_visible': getattr(ctrl, 'IsVisible', False),
-                        'help_text': getattr(ctrl, 'HelpText', ''),
-                        'access_key': getattr(ctrl, 'AccessKey', ''),
-                    }
-                    
-                    # Comprehensive accessibility properties - THE KEY ENHANCEMENT!
-                    element_info['accessible_name'] = getattr(ctrl, 'AccessibleName', '')
-                    
-                    # Advanced accessibility properties via GetPropertyValue
-                    try:
-                        name_prop = ctrl.GetPropertyValue(auto.PropertyId.NameProperty)
-                        element_info['name_property'] = str(name_prop) if name_prop else ''
-                    except:
-                        element_info['name_property'] = ''
+                    # Every property in one BuildUpdatedCache round trip instead of one call each
+                    values = _read_cached_properties(ctrl, cache_request, property_ids)
+                    if values is None:
+                        return True
+                    (name, automation_id, class_name, legacy_name, legacy_value, control_type,
+                     localized_control_type, is_enabled, is_offscreen, help_text, access_key,
+                     legacy_desc, rect) = values
+                    # Offscreen subtrees (hidden menus, collapsed panels) are pruned whole
+                    if is_offscreen and not include_offscreen:
+                        return False
+                    # Outer chrome above min_depth is walked through but not sent to the LLM
+                    if depth < min_depth:
+                        return True
                     
-                    try:
-                        legacy_name = ctrl.GetPropertyValue(auto.PropertyId.LegacyIAccessibleNameProperty)
-                        element_info['legacy_accessible_name'] = str(legacy_name) if legacy_name else ''
-                    except:
-                        element_info['legacy_accessible_name'] = ''
+                    # Identifying properties first - most nodes are discarded right after
+                    name = str(name) if name else ''
+                    automation_id = str(automation_id) if automation_id else ''
+                    # Low-cardinality values ("Edit", "Button", ...) repeat hundreds of times
+                    class_name = sys.intern(str(class_name)) if class_name else ''
                     
-                    try:
-                        legacy_value = ctrl.GetPropertyValue(auto.PropertyId.LegacyIAccessibleValueProperty)
-                        element_info['legacy_accessible_value'] = str(legacy_value) if legacy_value else ''
-                    except:
-                        element_info['legacy_accessible_value'] = ''
+                    # The target itself turned up - no need to ask the LLM at all
+                    if target_lower and (automation_id == field_name or name.lower() == target_lower):
+                        exact_hits.append(ctrl)
                     
-                    try:
-                        legacy_desc = ctrl.GetPropertyValue(auto.PropertyId.LegacyIAccessibleDescriptionProperty)
-                        element_info['legacy_accessible_description'] = str(legacy_desc) if legacy_desc else ''
-                    except:
-                        element_info['legacy_accessible_description'] = ''
+                    # Comprehensive accessibility properties - THE KEY ENHANCEMENT!
+                    accessible_name = getattr(ctrl, 'AccessibleName', None) or ''
+                    name_property = name  # NameProperty is the same UIA property as Name
+                    legacy_accessible_name = str(legacy_name) if legacy_name else ''
+                    legacy_accessible_value = str(legacy_value) if legacy_value else ''
                     
-                    # Bounds information
-                    try:
-                        if hasattr(ctrl, 'BoundingRectangle') and ctrl.BoundingRectangle:
-                            rect = ctrl.BoundingRectangle
-                            element_info['bounds'] = {
-                                'x': rect.left, 'y': rect.top,
-                                'width': rect.width(), 'height': rect.height()
-                            }
-                        else:
-                            element_info['bounds'] = {'x': 0, 'y': 0, 'width': 0, 'height': 0}
-                    except:
-                        element_info['bounds'] = {'x': 0, 'y': 0, 'width': 0, 'height': 0}
+                    # Include element only if it has ANY identifying information (including accessibility)
+                    if not any((name, automation_id, class_name, accessible_name, name_property,
+                                legacy_accessible_name, legacy_accessible_value)):
+                        return True
                     
-                    # Include element if it has ANY identifying information (including accessibility)
-                    if (element_info['name'] or element_info['automation_id'] or 
-                        element_info['class_name'] or element_info['accessible_name'] or
-                        element_info['name_property'] or element_info['legacy_accessible_name'] or
-                        element_info['legacy_accessible_value']):
-                        elements.append(element_info)
+                    # Bounds information as [x, y, width, height]
+                    bounds = [int(v) for v in rect] if rect and len(rect) == 4 else [0, 0, 0, 0]
                     
-                    # Recursively collect children
-                    try:
-                        children = ctrl.GetChildren()
-                        for child in children:
-                            collect_element_info(child, depth + 1)
-                    except:
-                        pass
+                    elements.append(
+                        ctrl,
+                        name=name,
+                        automation_id=automation_id,
+                        class_name=class_name,
+                        control_type=sys.intern(auto.ControlTypeNames.get(control_type, str(control_type))),
+                        localized_control_type=sys.intern(str(localized_control_type)) if localized_control_type else '',
+                        is_enabled=bool(is_enabled),
+                        is_visible=not is_offscreen,
+                        help_text=str(help_text) if help_text else '',
+                        access_key=str(access_key) if access_key else '',
+                        accessible_name=accessible_name,
+                        name_property=name_property,
+                        legacy_accessible_name=legacy_accessible_name,
+                        legacy_accessible_value=legacy_accessible_value,
+                        legacy_accessible_description=str(legacy_desc) if legacy_desc else '',
+                        bounds=bounds,
+                    )
                         
                 except:
                     pass  # Skip problematic elements
+                return True
+            
+            # The prompt is token-limited anyway - stop on element count or wall time
+            deadline = time.perf_counter() + self.collection_timeout_s
+            budget_lock = threading.Lock()
+            collected = [0]
+            
+            def within_budget(added: int) -> bool:
+                if exact_hits:
+                    return False
+                with budget_lock:
+                    collected[0] += added
+                    return collected[0] < self.max_collected_elements and time.perf_counter() < deadline
+            
+            def walk_subtree(root):
+                # Breadth-first walk so shallow (user-visible) elements come first
+                subtree_elements = CollectedElements()
+                with auto.UIAutomationInitializerInThread():
+                    cache_request = self._create_cache_request(property_ids)
+                    queue = deque([(root, 1)])
+                    while queue:
+                        ctrl, depth = queue.popleft()
+                        before = len(subtree_elements)
+                        descend = collect_element_info(ctrl, depth, subtree_elements, cache_request)
+                        if not within_budget(len(subtree_elements) - before):
+                            break
+                        if descend and depth < max_depth:  # Limit walk depth
+                            try:
+                                queue.extend((child, depth + 1) for child in _get_children(ctrl, children_cache))
+                            except:
+                                pass
+                return subtree_elements
+            
+            elements = CollectedElements()
+            collect_element_info(window, 0, elements, self._create_cache_request(property_ids))
+            within_budget(len(elements))
+            try:
+                children = _get_children(window, children_cache)
+            except:
+                children = []
+            
+            # Independent panes are walked concurrently; COM calls release the GIL
+            if children and not exact_hits:
+                with ThreadPoolExecutor(max_workers=min(self.collection_workers, len(children))) as executor:
+                    for subtree_elements in executor.map(walk_subtree, children):
+                        elements.extend(subtree_elements)
             
-            collect_element_info(window, 0)
-            print(f"📊 Collected {len(elements)} UI elements with accessibility properties")
+            elements.exact_match = exact_hits[0] if exact_hits else None
+            logger.info("📊 Collected %s UI elements with accessibility properties", len(elements))
             return elements
             
         except Exception as e:
-            print(f"❌ Failed to collect UI elements: {str(e)}")
-            return []
+            logger.error("❌ Failed to collect UI elements: %s", e)
+            return CollectedElements()
     
-    def _create_llm_prompt(self, field_name: str, field_type: str, elements: List[Dict[str, Any]]) -> str:
+    def _create_llm_prompt(self, field_name: str, field_type: str, elements: CollectedElements,
+                           window_name: str = '') -> str:
         """Create enhanced LLM prompt emphasizing accessibility properties"""
-        elements_json = json.dumps(elements, indent=2)
-        
-        prompt = f"""I need to find a UI element in a Windows desktop application. Here are the details:
-
-TARGET ELEMENT:
-- Field Name: "{field_name}"
-- Field Type: "{field_type}"
-
-AVAILABLE UI ELEMENTS (with full accessibility properties):
-{elements_json}
-
-TASK:
-Find the element that best matches "{field_name}". The field name might be stored in ANY of these properties:
-
-🔍 SEARCH PRIORITY (check ALL of these):
-1. automation_id (AutomationId property)
-2. name (Name property)
-3. accessible_name (AccessibleName property) ⭐ VERY IMPORTANT
-4. name_property (NameProperty via GetPropertyValue) 
-5. legacy_accessible_name (Legacy IAccessible Name) ⭐ IMPORTANT
-6. legacy_accessible_value (Legacy IAccessible Value)
-7. class_name (ClassName property)
-
-MATCHING STRATEGIES:
-- Exact match on ANY accessibility property
-- Partial match (case-insensitive) on accessibility properties
-- Control type compatibility
-- Contextual similarity
-
-RESPONSE FORMAT (JSON only):
-{{
-    "matched_element": {{
-        "name": "exact_name_from_list",
-        "automation_id": "exact_automation_id_from_list",
-        "accessible_name": "exact_accessible_name_from_list",
-        "legacy_accessible_name": "exact_legacy_accessible_name_from_list",
-        "class_name": "exact_class_name_from_list",
-        "control_type": "exact_control_type_from_list"
-    }},
-    "confidence": 0.95,
-    "reasoning": "Brief explanation of match",
-    "matched_property": "name_of_property_that_matched"
-}}
-
-If no match: {{"matched_element": null, "confidence": 0.0, "reasoning": "No match found", "matched_property": null}}"""
+        # Steps against the same window usually see the same element table - serialize it once
+        key = (window_name, hash(tuple(zip(elements.columns['name'], elements.columns['automation_id'],
+                                           elements.columns['class_name']))))
+        elements_json = self._prompt_cache.get(key)
+        if elements_json is None:
+            elements_json = json.dumps(elements.to_table(exclude=PROMPT_EXCLUDED_COLUMNS), separators=(',', ':'))
+            if len(self._prompt_cache) >= 32:
+                self._prompt_cache.clear()
+            self._prompt_cache[key] = elements_json
         
-        return prompt
+        return LLM_PROMPT_TEMPLATE.format(field_name=field_name, field_type=field_type,
+                                          elements_json=elements_json)
     
     def _query_llm(self, prompt: str) -> Optional[Dict[str, Any]]:
-        """Query LLM and parse response"""
+        """Query LLM and parse response; a repeated prompt is answered from the session cache"""
+        key = hashlib.sha256(prompt.encode('utf-8')).hexdigest()
+        cached = self._llm_cache.get(key)
+        if cached is not None:
+            logger.info("🤖 Reusing cached LLM response")
+            return dict(cached)
         try:
-            response = self.openai_client.chat.completions.create(
+            request = dict(
                 model=self.openai_model,
                 messages=[
                     {"role": "system", "content": "You are an expert at Windows UI element analysis. Return only valid JSON."},
                     {"role": "user", "content": prompt}
                 ],
                 temperature=0.1,
-                max_tokens=1000
+                seed=0,
+                max_tokens=256,  # the response schema is small
+                stream=True,
             )
-            
-            response_text = response.choices[0].message.content.strip()
+            from openai import BadRequestError  # already loaded with the client
+            try:
+                stream = self.openai_client.chat.completions.create(
+                    response_format={"type": "json_object"}, **request)
+            except BadRequestError:
+                # Older models (e.g. gpt-4) reject JSON mode - fall back to the plain prompt.
+                # Network, auth and rate-limit errors go to the outer handler, not a second call.
+                stream = self.openai_client.chat.completions.create(**request)
+            
+            # Accumulate tokens as they arrive instead of blocking on the full response
+            parts = []
+            for chunk in stream:
+                if chunk.choices and chunk.choices[0].delta.content:
+                    parts.append(chunk.choices[0].delta.content)
+            response_text = ''.join(parts).strip()
             
             try:
-                return json.loads(response_text)
+                parsed = json.loads(response_text)
             except json.JSONDecodeError:
-                print(f"❌ LLM returned invalid JSON: {response_text}")
+                # Still possible in JSON mode when the response is cut off at max_tokens
+                logger.error("❌ LLM returned invalid JSON: %s", response_text)
                 return None
+            
+            # Only well-formed object answers are kept - a bad response is worth asking again
+            if isinstance(parsed, dict):
+                if len(self._llm_cache) >= 128:
+                    self._llm_cache.clear()
+                self._llm_cache[key] = parsed
+                return dict(parsed)
+            return parsed
                 
         except Exception as e:
-            print(f"❌ LLM query failed: {str(e)}")
+            logger.error("❌ LLM query failed: %s", e)
             return None
     
-    def _find_element_from_llm_response(self, llm_response: Dict[str, Any], window_name: str) -> Optional[Any]:
+    def _find_element_from_llm_response(self, llm_response: Dict[str, Any], window_name: str,
+                                        elements: Optional[CollectedElements] = None,
+                                        children_cache: Optional[ChildrenCache] = None
+                                        ) -> Optional[Element]:
         """Find element based on LLM response with accessibility support"""
         try:
             matched_element = llm_response.get('matched_element')
@@ -562,16 +1456,18 @@ If no match: {{"matched_element": null, "confidence": 0.0, "reasoning": "No matc
             reasoning = llm_response.get('reasoning', '')
             matched_property = llm_response.get('matched_property', '')
             
-            print(f"🤖 LLM Match - Confidence: {confidence:.2f}, Property: {matched_property}")
-            print(f"   Reasoning: {reasoning}")
+            logger.info("🤖 LLM Match - Confidence: %.2f, Property: %s", confidence, matched_property)
+            logger.info("   Reasoning: %s", reasoning)
             
             if not matched_element or confidence < 0.5:
-                print("❌ LLM confidence too low or no match found")
+                logger.error("❌ LLM confidence too low or no match found")
                 return None
             
-            window = self._find_window(window_name)
-            if not window:
-                return None
+            # The collected controls are still live - resolve the picked row without a re-walk
+            index = matched_element.get('index')
+            if elements is not None and isinstance(index, int) and 0 <= index < len(elements):
+                logger.info("✅ Found element via LLM guidance: row %s", index)
+                return Element('ui_automation', ui=elements.controls[index])
             
             # Extract all possible identifiers from LLM response
             search_criteria = {
@@ -582,55 +1478,72 @@ If no match: {{"matched_element": null, "confidence": 0.0, "reasoning": "No matc
                 'class_name': matched_element.get('class_name', '')
             }
             
+            # No usable index - score the collected rows against the identifiers instead
+            if elements is not None:
+                best = elements.best_match(search_criteria)
+                if best >= 0:
+                    logger.info("✅ Found element via LLM guidance: best scoring row %s", best)
+                    return Element('ui_automation', ui=elements.controls[best])
+            
+            window = self._find_window(window_name)
+            if not window:
+                return None
+            
             # Search using the comprehensive method
-            def search_with_llm_criteria(ctrl, criteria, max_depth=5, current_depth=0):
-                if current_depth >= max_depth:
-                    return None
+            def matches_llm_criteria(ctrl, criteria) -> bool:
+                # Check all criteria from LLM - each property is one COM read (hasattr would add a second)
+                for key, attribute in (('automation_id', 'AutomationId'), ('name', 'Name'),
+                                       ('accessible_name', 'AccessibleName'), ('class_name', 'ClassName')):
+                    if criteria[key] and getattr(ctrl, attribute, None) == criteria[key]:
+                        return True
                 
-                try:
-                    # Check all criteria from LLM
-                    if criteria['automation_id'] and hasattr(ctrl, 'AutomationId') and ctrl.AutomationId == criteria['automation_id']:
-                        return ctrl
-                    if criteria['name'] and hasattr(ctrl, 'Name') and ctrl.Name == criteria['name']:
-                        return ctrl
-                    if criteria['accessible_name'] and hasattr(ctrl, 'AccessibleName') and ctrl.AccessibleName == criteria['accessible_name']:
-                        return ctrl
-                    if criteria['class_name'] and hasattr(ctrl, 'ClassName') and ctrl.ClassName == criteria['class_name']:
-                        return ctrl
-                    
-                    # Check legacy accessible name
-                    if criteria['legacy_accessible_name']:
-                        try:
-                            legacy_name = ctrl.GetPropertyValue(auto.PropertyId.LegacyIAccessibleNameProperty)
-                            if legacy_name and str(legacy_name) == criteria['legacy_accessible_name']:
-                                return ctrl
-                        except:
-                            pass
-                    
-                    # Search children
-                    children = ctrl.GetChildren()
-                    for child in children:
-                        result = search_with_llm_criteria(child, criteria, max_depth, current_depth + 1)
-                        if result:
-                            return result
-                            
-                except:
-                    pass
+                # Check legacy accessible name
+                if criteria['legacy_accessible_name']:
+                    return _safe_get(ctrl, _PID_LEGACY_NAME) == criteria['legacy_accessible_name']
+                
+                return False
+            
+            def search_with_llm_criteria(root, criteria, max_depth=5):
+                queue = deque([(root, 0)])
+                while queue:
+                    ctrl, depth = queue.popleft()
+                    try:
+                        if matches_llm_criteria(ctrl, criteria):
+                            return ctrl
+                        if depth + 1 < max_depth:
+                            queue.extend((child, depth + 1) for child in _get_children(ctrl, children_cache))
+                    except:
+                        pass
                 
                 return None
             
-            element = search_with_llm_criteria(window, search_criteria)
+            # Exact-match criteria are resolved natively before the manual walk; like that walk,
+            # this does not filter offscreen controls
+            element = None
+            for key, property_id in (('automation_id', _PID_AUTOMATION_ID),
+                                     ('name', _PID_NAME),
+                                     ('class_name', _PID_CLASS_NAME)):
+                if search_criteria[key]:
+                    element = self._find_first_native(window, property_id, search_criteria[key],
+                                                      include_offscreen=True)
+                    if element:
+                        break
+            
+            # The collection already visited (and scored) every control a manual walk could reach,
+            # so the walk is only worth doing when no collection was passed in
+            if not element and elements is None:
+                element = search_with_llm_criteria(window, search_criteria)
             if element:
                 identifier = (search_criteria['accessible_name'] or search_criteria['name'] or 
                             search_criteria['automation_id'] or search_criteria['class_name'])
-                print(f"✅ Found element via LLM guidance: {identifier}")
-                return {'type': 'ui_automation', 'element': element}
+                logger.info("✅ Found element via LLM guidance: %s", identifier)
+                return Element('ui_automation', ui=element)
             
-            print("❌ Could not find element despite LLM guidance")
+            logger.error("❌ Could not find element despite LLM guidance")
             return None
             
         except Exception as e:
-            print(f"❌ Failed to find element from LLM response: {str(e)}")
+            logger.error("❌ Failed to find element from LLM response: %s", e)
             return None
 
 
@@ -638,260 +1551,388 @@ If no match: {{"matched_element": null, "confidence": 0.0, "reasoning": "No matc
 # ACTION EXECUTOR CLASS
 # =============================================================================
 
+# Special key mappings for Win32 API (virtual key codes)
+_SPECIAL_KEYS = {
+    'enter': win32con.VK_RETURN, 'tab': win32con.VK_TAB, 'escape': win32con.VK_ESCAPE,
+    'space': win32con.VK_SPACE, 'backspace': win32con.VK_BACK, 'delete': win32con.VK_DELETE,
+    'home': win32con.VK_HOME, 'end': win32con.VK_END, 'pageup': win32con.VK_PRIOR,
+    'pagedown': win32con.VK_NEXT, 'up': win32con.VK_UP, 'down': win32con.VK_DOWN,
+    'left': win32con.VK_LEFT, 'right': win32con.VK_RIGHT,
+}
+_SPECIAL_KEYS.update({f'f{i}': win32con.VK_F1 + i - 1 for i in range(1, 13)})
+
+# Key names for uiautomation SendKeys
+_UI_KEY_MAP = {
+    'ctrl': '{Ctrl}', 'alt': '{Alt}', 'shift': '{Shift}',
+    'enter': '{Enter}', 'tab': '{Tab}', 'escape': '{Esc}',
+    'space': ' ', 'backspace': '{Backspace}', 'delete': '{Delete}',
+}
+_UI_KEY_MAP.update({f'f{i}': f'{{F{i}}}' for i in range(1, 13)})
+
+_ENTER_PRESS = ((win32con.VK_RETURN, 0), (win32con.VK_RETURN, KEYEVENTF_KEYUP))
+_MODIFIER_VKS = {'ctrl': win32con.VK_CONTROL, 'alt': win32con.VK_MENU, 'shift': win32con.VK_SHIFT}
+
+# Key combination string -> (modifier vks, main key, main vk, SendKeys string); scripts repeat the same few combos
+_KEY_COMBINATIONS: Dict[str, Tuple[Tuple[int, ...], Optional[str], Optional[int], str]] = {}
+
+
+def _parse_key_combination(key_combination: str) -> Tuple[Tuple[int, ...], Optional[str], Optional[int], str]:
+    """Split 'Ctrl+Shift+A'-style input into modifier vks, main key name, its vk (None if unknown)
+    and the uiautomation SendKeys string, all in one pass"""
+    parsed = _KEY_COMBINATIONS.get(key_combination)
+    if parsed is None:
+        modifier_keys = []
+        ui_modifiers = []
+        main_key = None
+        for key in key_combination.lower().split('+'):
+            key = key.strip()
+            vk = _MODIFIER_VKS.get(key)
+            if vk:
+                modifier_keys.append(vk)
+                ui_modifiers.append(_UI_KEY_MAP[key])
+            else:
+                main_key = key
+        
+        if main_key in _SPECIAL_KEYS:
+            vk_code = _SPECIAL_KEYS[main_key]
+        elif main_key and len(main_key) == 1:
+            vk_code = ord(main_key.upper())
+        else:
+            vk_code = None
+        
+        ui_keys = ''.join(ui_modifiers) + (_UI_KEY_MAP.get(main_key, main_key) if main_key else '')
+        parsed = (tuple(modifier_keys), main_key, vk_code, ui_keys)
+        if len(_KEY_COMBINATIONS) >= 64:
+            _KEY_COMBINATIONS.clear()
+        _KEY_COMBINATIONS[key_combination] = parsed
+    return parsed
+
+
 class ActionExecutor:
     """Executes automation actions on UI elements"""
     
     def __init__(self):
-        # Special key mappings for Win32 API
-        self.special_keys = {
-            'enter': win32con.VK_RETURN, 'tab': win32con.VK_TAB, 'escape': win32con.VK_ESCAPE,
-            'space': win32con.VK_SPACE, 'backspace': win32con.VK_BACK, 'delete': win32con.VK_DELETE,
-            'home': win32con.VK_HOME, 'end': win32con.VK_END, 'pageup': win32con.VK_PRIOR,
-            'pagedown': win32con.VK_NEXT, 'up': win32con.VK_UP, 'down': win32con.VK_DOWN,
-            'left': win32con.VK_LEFT, 'right': win32con.VK_RIGHT,
-        }
+        # Element (UIA control or hwnd) that the last click left with keyboard focus
+        self._last_focused = None
+        # hwnd -> screen center of its window rect, dropped whenever a window is activated
+        self._center_cache: Dict[int, Tuple[int, int]] = {}
+        # Dropdown runtime id -> {lowercased item name: item control}
+        self._select_index: Dict[Tuple[int, ...], Dict[str, Any]] = {}
+        # Lowercased item name -> case-insensitive UIA Name condition, reused across selects
+        self._name_conditions: Dict[str, Any] = {}
+    
+    def reset_focus(self) -> None:
+        """Forget the focused element and cached click points, e.g. after another window was activated"""
+        self._last_focused = None
+        self._center_cache.clear()
+    
+    def _ensure_foreground(self, hwnd: int) -> None:
+        """Bring hwnd's top-level window to the foreground unless it is already there"""
+        root = _GetAncestor(hwnd, win32con.GA_ROOT) or hwnd
+        foreground = _GetForegroundWindow()
+        if foreground == root:
+            return
+        
+        if not _SetForegroundWindow(root) and foreground:
+            # Only the foreground thread may move focus, so borrow its input state for the call
+            fg_thread, _ = win32process.GetWindowThreadProcessId(foreground)
+            own_thread = win32api.GetCurrentThreadId()
+            win32process.AttachThreadInput(own_thread, fg_thread, True)
+            try:
+                _SetForegroundWindow(root)
+            finally:
+                win32process.AttachThreadInput(own_thread, fg_thread, False)
+    
+    def _focus_key(self, element: Element):
+        return element.ui if element.kind == 'ui_automation' else element.hwnd
+    
+    def _is_focused(self, element: Element) -> bool:
+        """Whether the element currently has keyboard focus, asked of the system rather than our own tracking"""
+        try:
+            if element.kind == 'win32':
+                return _focused_hwnd(element.hwnd) == element.hwnd
+            auto = _get_auto()
+            focused = auto.GetFocusedControl()
+            return bool(focused) and bool(auto._AutomationClient.instance().IUIAutomation.CompareElements(
+                focused.Element, element.ui.Element))
+        except Exception:
+            return False
+    
+    def _focus_element(self, element: Element, settle: float) -> None:
+        """Click the element to focus it, unless it already has focus"""
+        last = self._last_focused
+        if last is not None:
+            key = self._focus_key(element)
+            # Controls are compared by identity, hwnds by value
+            if key is last or (element.kind == 'win32' and key == last):
+                return
+        # e.g. focus moved here by a Tab from the previous step, or the app focused it itself
+        if self._is_focused(element):
+            self._last_focused = self._focus_key(element)
+            return
         
-        # Function keys F1-F12
-        for i in range(1, 13):
-            self.special_keys[f'f{i}'] = win32con.VK_F1 + i - 1
+        self._click_element(element)
+        # Wait for the click to be processed rather than a fixed settle time
+        hwnd = element.hwnd if element.kind == 'win32' else _GetForegroundWindow()
+        if hwnd:
+            _wait_for_window_idle(hwnd, int(settle * 1000))
+        else:
+            time.sleep(settle)
     
-    def execute_action(self, element: Dict[str, Any], action_type: str, data: str = '', special_key: str = '') -> bool:
+    def execute_action(self, element: Element, action_type: str, data: str = '', special_key: str = '') -> bool:
         """Execute the specified action on the element"""
         try:
             action_type = action_type.lower()
-            print(f"⚡ Executing action: {action_type}")
-            
-            if action_type == 'click':
-                return self._click_element(element)
-            elif action_type == 'typeinto':
-                return self._type_into_element(element, data)
-            elif action_type == 'keypress':
-                return self._key_press(element, special_key)
-            elif action_type == 'select':
-                return self._select_element(element, data)
-            else:
-                print(f"❌ Unknown action type: {action_type}")
+            logger.debug("⚡ Executing action: %s", action_type)
+            
+            handler = self._ACTIONS.get(action_type)
+            if handler is None:
+                logger.error("❌ Unknown action type: %s", action_type)
                 return False
+            return handler(self, element, data, special_key)
                 
         except Exception as e:
-            print(f"❌ Action execution failed: {str(e)}")
+            logger.error("❌ Action execution failed: %s", e)
             return False
     
-    def _click_element(self, element: Dict[str, Any]) -> bool:
+    def _click_element(self, element: Element) -> bool:
         """Click on the element"""
         try:
-            if element['type'] == 'ui_automation':
-                ui_element = element['element']
+            if element.kind == 'ui_automation':
+                ui_element = element.ui
                 ui_element.Click()
-                print(f"🖱️  Clicked element via UI Automation")
+                self._last_focused = ui_element
+                logger.info("🖱️  Clicked element via UI Automation")
                 return True
                 
-            elif element['type'] == 'win32':
-                hwnd = element['hwnd']
-                rect = win32gui.GetWindowRect(hwnd)
-                x = (rect[0] + rect[2]) // 2
-                y = (rect[1] + rect[3]) // 2
+            elif element.kind == 'win32':
+                hwnd = element.hwnd
+                if _window_class(hwnd) == 'button':
+                    # Posted so a button that opens a modal dialog cannot block us; needs no foreground
+                    _PostMessageW(hwnd, win32con.BM_CLICK, 0, 0)
+                    self._last_focused = None
+                    logger.info("🖱️  Clicked button via BM_CLICK")
+                    return True
                 
-                win32gui.SetForegroundWindow(hwnd)
-                win32api.SetCursorPos((x, y))
-                win32api.mouse_event(win32con.MOUSEEVENTF_LEFTDOWN, x, y, 0, 0)
-                win32api.mouse_event(win32con.MOUSEEVENTF_LEFTUP, x, y, 0, 0)
-                print(f"🖱️  Clicked element via Win32 API at ({x}, {y})")
+                center = self._center_cache.get(hwnd)
+                if center is None:
+                    rect = win32gui.GetWindowRect(hwnd)
+                    center = self._center_cache[hwnd] = ((rect[0] + rect[2]) // 2, (rect[1] + rect[3]) // 2)
+                x, y = center
+                
+                self._ensure_foreground(hwnd)
+                if not _SetCursorPos(x, y):
+                    raise ctypes.WinError(ctypes.get_last_error())
+                _send_left_click()
+                self._last_focused = hwnd
+                logger.info("🖱️  Clicked element via Win32 API at (%s, %s)", x, y)
                 return True
             
             return False
             
         except Exception as e:
-            print(f"❌ Click failed: {str(e)}")
+            self._last_focused = None
+            logger.error("❌ Click failed: %s", e)
             return False
     
-    def _type_into_element(self, element: Dict[str, Any], text: str) -> bool:
+    def _type_into_element(self, element: Element, text: str) -> bool:
         """Type text into the element"""
         try:
-            self._click_element(element)
-            time.sleep(0.2)
-            
-            if element['type'] == 'ui_automation':
-                ui_element = element['element']
-                ui_element.SendKeys('{Ctrl}a')
-                time.sleep(0.5)
+            if element.kind == 'ui_automation':
+                ui_element = element.ui
+                if self._set_value(ui_element, text):
+                    logger.info("⌨️  Set '%s' via UI Automation ValuePattern", text)
+                    return True
+                
+                self._focus_element(element, 0.2)
+                # SendKeys already waits after sending, just shorten that wait for the select-all
+                ui_element.SendKeys('{Ctrl}a', waitTime=0.05)
                 ui_element.SendKeys(text)
-                print(f"⌨️  Typed '{text}' via UI Automation")
+                logger.info("⌨️  Typed '%s' via UI Automation", text)
                 return True
                 
-            elif element['type'] == 'win32':
-                hwnd = element['hwnd']
-                win32gui.SetForegroundWindow(hwnd)
+            elif element.kind == 'win32':
+                hwnd = element.hwnd
+                class_name = _window_class(hwnd)
+                if class_name == 'edit' or class_name.startswith('richedit'):
+                    # Edit controls take the whole text in one message, no focus or foreground needed
+                    win32gui.SendMessage(hwnd, win32con.WM_SETTEXT, 0, text)
+                    logger.info("⌨️  Set '%s' via WM_SETTEXT", text)
+                    return True
                 
-                # Clear existing text
-                win32gui.SendMessage(hwnd, win32con.WM_KEYDOWN, win32con.VK_CONTROL, 0)
-                win32gui.SendMessage(hwnd, win32con.WM_CHAR, ord('a'), 0)
-                win32gui.SendMessage(hwnd, win32con.WM_KEYUP, win32con.VK_CONTROL, 0)
-                time.sleep(0.5)
+                self._focus_element(element, 0.2)
+                self._ensure_foreground(hwnd)
                 
-                # Type new text
-                for char in text:
-                    win32gui.SendMessage(hwnd, win32con.WM_CHAR, ord(char), 0)
-                    time.sleep(0.01)
+                # Clear existing text - a real Ctrl+A; a sent WM_KEYDOWN never sets the Ctrl key state
+                _send_key_combination([win32con.VK_CONTROL], ord('A'))
                 
-                print(f"⌨️  Typed '{text}' via Win32 API")
+                # Type new text in one batched injection, then sync once so the next step sees it
+                _send_unicode_text(text)
+                _wait_for_window_idle(hwnd, 1000)
+                
+                logger.info("⌨️  Typed '%s' via Win32 API", text)
                 return True
             
             return False
             
         except Exception as e:
-            print(f"❌ Type into failed: {str(e)}")
+            logger.error("❌ Type into failed: %s", e)
             return False
     
-    def _key_press(self, element: Dict[str, Any], key_combination: str) -> bool:
+    def _set_value(self, ui_element, text: str) -> bool:
+        """Replace the control's text with one ValuePattern.SetValue call, False if unsupported"""
+        try:
+            pattern = ui_element.GetPattern(_get_auto().PatternId.ValuePattern)
+            if pattern is None or pattern.IsReadOnly:
+                return False
+            pattern.SetValue(text, waitTime=0)
+            # Some controls advertise the pattern but ignore SetValue
+            return pattern.Value == text
+        except Exception:
+            return False
+    
+    def _key_press(self, element: Element, key_combination: str) -> bool:
         """Press special keys or key combinations"""
         try:
-            self._click_element(element)
-            time.sleep(0.1)
-            
-            keys = key_combination.lower().split('+')
-            modifier_keys = []
-            main_key = None
-            
-            for key in keys:
-                key = key.strip()
-                if key == 'ctrl':
-                    modifier_keys.append(win32con.VK_CONTROL)
-                elif key == 'alt':
-                    modifier_keys.append(win32con.VK_MENU)
-                elif key == 'shift':
-                    modifier_keys.append(win32con.VK_SHIFT)
-                else:
-                    main_key = key
-            
+            modifier_keys, main_key, vk_code, ui_keys = _parse_key_combination(key_combination)
             if not main_key:
-                print(f"❌ No main key found in combination: {key_combination}")
+                logger.error("❌ No main key found in combination: %s", key_combination)
                 return False
-            
-            # Get the virtual key code
-            if main_key in self.special_keys:
-                vk_code = self.special_keys[main_key]
-            elif len(main_key) == 1:
-                vk_code = ord(main_key.upper())
-            else:
-                print(f"❌ Unknown key: {main_key}")
+            if vk_code is None:
+                logger.error("❌ Unknown key: %s", main_key)
                 return False
             
+            # Keys act on the focused control; _focus_element skips the click when the
+            # element already has focus
+            self._focus_element(element, 0.1)
+            # Keys like Tab or Enter can move focus, so the next action clicks again
+            self._last_focused = None
+            
             # Send key combination
-            if element['type'] == 'ui_automation':
-                ui_element = element['element']
-                key_string = self._build_ui_automation_key_string(keys)
-                ui_element.SendKeys(key_string)
-                print(f"🔑 Pressed key combination '{key_combination}' via UI Automation")
+            if element.kind == 'ui_automation':
+                ui_element = element.ui
+                ui_element.SendKeys(ui_keys)
+                logger.info("🔑 Pressed key combination '%s' via UI Automation", key_combination)
                 return True
                 
-            elif element['type'] == 'win32':
-                hwnd = element['hwnd']
-                win32gui.SetForegroundWindow(hwnd)
-                
-                # Press modifier keys
-                for mod_key in modifier_keys:
-                    win32api.keybd_event(mod_key, 0, 0, 0)
+            elif element.kind == 'win32':
+                hwnd = element.hwnd
+                self._ensure_foreground(hwnd)
                 
-                # Press main key
-                win32api.keybd_event(vk_code, 0, 0, 0)
-                win32api.keybd_event(vk_code, 0, win32con.KEYEVENTF_KEYUP, 0)
+                # Modifiers, main key and releases go out as one atomic injection
+                _send_key_combination(modifier_keys, vk_code)
                 
-                # Release modifier keys
-                for mod_key in reversed(modifier_keys):
-                    win32api.keybd_event(mod_key, 0, win32con.KEYEVENTF_KEYUP, 0)
-                
-                print(f"🔑 Pressed key combination '{key_combination}' via Win32 API")
+                logger.info("🔑 Pressed key combination '%s' via Win32 API", key_combination)
                 return True
             
             return False
             
         except Exception as e:
-            print(f"❌ Key press failed: {str(e)}")
+            logger.error("❌ Key press failed: %s", e)
             return False
     
-    def _select_element(self, element: Dict[str, Any], value: str) -> bool:
+    def _select_element(self, element: Element, value: str) -> bool:
         """Select an item from a dropdown or list"""
         try:
-            if element['type'] == 'ui_automation':
-                ui_element = element['element']
+            if element.kind == 'ui_automation':
+                ui_element = element.ui
                 
-                # Try to expand if it's a combobox
+                # Expand only controls that support it and are still collapsed
                 try:
-                    ui_element.Expand()
-                    time.sleep(0.2)
-                except:
+                    auto = _get_auto()
+                    pattern = ui_element.GetPattern(auto.PatternId.ExpandCollapsePattern)
+                    expanded = auto.ExpandCollapseState.Expanded
+                    if pattern and pattern.ExpandCollapseState != expanded:
+                        pattern.Expand(waitTime=0)
+                        deadline = time.perf_counter() + 0.1
+                        while pattern.ExpandCollapseState != expanded and time.perf_counter() < deadline:
+                            time.sleep(0.01)
+                except Exception:
                     pass
                 
                 # Try to find and select the item
                 try:
-                    children = ui_element.GetChildren()
-                    for child in children:
-                        if hasattr(child, 'Name') and child.Name.lower() == value.lower():
-                            child.Select()
-                            print(f"📋 Selected '{value}' from dropdown via UI Automation")
-                            return True
+                    target = value.lower()
+                    child = self._child_name_index(ui_element).get(target)
+                    if child is None:
+                        # Nested (ComboBox > List > item) or repopulated since it was indexed -
+                        # one native descendant search instead of re-walking the children
+                        child = self._find_item_native(ui_element, value)
+                    if child is not None:
+                        child.Select()
+                        logger.info("📋 Selected '%s' from dropdown via UI Automation", value)
+                        return True
                 except:
                     pass
                 
-                # Fallback: click and type
-                ui_element.Click()
-                time.sleep(0.2)
-                ui_element.SendKeys(value)
-                time.sleep(0.2)
+                # Fallback: enter the value (one SetValue call for editable combos, else typed) and confirm
+                if not self._set_value(ui_element, value):
+                    self._focus_element(element, 0.2)
+                    # SendKeys already waits after sending, just shorten that wait before the Enter
+                    ui_element.SendKeys(value, waitTime=0.2)
                 ui_element.SendKeys('{Enter}')
-                print(f"📋 Selected '{value}' by typing via UI Automation")
+                logger.info("📋 Selected '%s' by typing via UI Automation", value)
                 return True
                     
-            elif element['type'] == 'win32':
-                hwnd = element['hwnd']
-                self._click_element(element)
-                time.sleep(0.2)
-                
-                # Type the value
-                for char in value:
-                    win32gui.SendMessage(hwnd, win32con.WM_CHAR, ord(char), 0)
-                    time.sleep(0.01)
+            elif element.kind == 'win32':
+                self._focus_element(element, 0.2)
                 
-                # Press Enter to confirm
-                win32gui.SendMessage(hwnd, win32con.WM_KEYDOWN, win32con.VK_RETURN, 0)
-                win32gui.SendMessage(hwnd, win32con.WM_KEYUP, win32con.VK_RETURN, 0)
-                print(f"📋 Selected '{value}' via Win32 API")
+                # Type the value and press Enter to confirm, all in one batched injection
+                _send_unicode_text(value, then=_ENTER_PRESS)
+                _wait_for_window_idle(element.hwnd, 1000)
+                logger.info("📋 Selected '%s' via Win32 API", value)
                 return True
             
             return False
             
         except Exception as e:
-            print(f"❌ Select failed: {str(e)}")
+            logger.error("❌ Select failed: %s", e)
             return False
     
-    def _build_ui_automation_key_string(self, keys):
-        """Build UI Automation key string from key combination"""
-        key_map = {
-            'ctrl': '{Ctrl}', 'alt': '{Alt}', 'shift': '{Shift}',
-            'enter': '{Enter}', 'tab': '{Tab}', 'escape': '{Esc}',
-            'space': ' ', 'backspace': '{Backspace}', 'delete': '{Delete}',
-        }
-        
-        # Function keys
-        for i in range(1, 13):
-            key_map[f'f{i}'] = f'{{F{i}}}'
+    def _find_item_native(self, ui_element, value: str):
+        """First descendant whose Name equals value (ignoring case), matched inside the UIA core"""
+        auto = _get_auto()
+        target = value.lower()
+        condition = self._name_conditions.get(target)
+        if condition is None:
+            uia = auto._AutomationClient.instance().IUIAutomation
+            condition = uia.CreatePropertyConditionEx(_PID_NAME, value, _PROPERTY_CONDITION_IGNORE_CASE)
+            if len(self._name_conditions) >= 64:
+                self._name_conditions.clear()
+            self._name_conditions[target] = condition
+        element = ui_element.Element.FindFirst(auto.TreeScope.Descendants, condition)
+        return auto.Control.CreateControlFromElement(element) if element else None
+    
+    def _child_name_index(self, ui_element) -> Dict[str, Any]:
+        """Map lowercased child names to children, cached per dropdown across selects"""
+        try:
+            key = tuple(ui_element.GetRuntimeId())
+        except Exception:
+            key = None
         
-        if len(keys) == 1:
-            key = keys[0].strip().lower()
-            return key_map.get(key, key)
-        else:
-            # Handle combinations like Ctrl+A
-            result = ''
-            for key in keys[:-1]:  # All but last are modifiers
-                key = key.strip().lower()
-                if key in ['ctrl', 'alt', 'shift']:
-                    result += key_map[key]
-            
-            # Add the main key
-            main_key = keys[-1].strip().lower()
-            result += key_map.get(main_key, main_key)
-            return result
+        index = self._select_index.get(key) if key else None
+        if index is None:
+            index = {}
+            for child in ui_element.GetChildren():
+                name = child.Name
+                if name:
+                    index.setdefault(name.lower(), child)  # first match wins, as in a linear scan
+            if key:
+                if len(self._select_index) >= 64:
+                    self._select_index.clear()
+                self._select_index[key] = index
+        return index
+    
+    # Lowercased action type -> handler(self, element, data, special_key)
+    _ACTIONS = {
+        'click': lambda self, element, data, special_key: self._click_element(element),
+        'typeinto': lambda self, element, data, special_key: self._type_into_element(element, data),
+        'keypress': lambda self, element, data, special_key: self._key_press(element, special_key),
+        'select': lambda self, element, data, special_key: self._select_element(element, data),
+    }
+
+
+_VALID_ACTIONS = frozenset(ActionExecutor._ACTIONS) | {'windowactivate'}
 
 
 # =============================================================================
@@ -906,19 +1947,23 @@ class DesktopAutomationNode:
     complete desktop automation capabilities with enhanced accessibility support.
     """
     
-    def __init__(self, openai_api_key: Optional[str] = None, openai_model: str = "gpt-4"):
+    def __init__(self, openai_api_key: Optional[str] = None, openai_model: str = "gpt-4o-mini"):
         """
         Initialize the desktop automation node
         
         Args:
             openai_api_key: Optional OpenAI API key for LLM fallback
-            openai_model: OpenAI model to use (default: gpt-4)
+            openai_model: OpenAI model to use (default: gpt-4o-mini)
         """
-        print("🚀 Initializing Desktop Automation Node with AccessibleName support...")
+        logger.info("🚀 Initializing Desktop Automation Node with AccessibleName support...")
         self.window_manager = WindowManager()
         self.element_detector = ElementDetector(openai_api_key, openai_model)
         self.action_executor = ActionExecutor()
-        print("✅ Desktop Automation Node ready!")
+        # One-step look-ahead: the next step's element is resolved while the current step runs
+        self._prefetch_pool = ThreadPoolExecutor(max_workers=1, thread_name_prefix='element-prefetch',
+                                                 initializer=_init_worker_com)
+        self._prefetch: Optional[Tuple[CompiledStep, Future]] = None
+        logger.info("✅ Desktop Automation Node ready!")
         
     def execute_automation(self, state: AutomationState) -> AutomationState:
         """
@@ -930,136 +1975,197 @@ class DesktopAutomationNode:
         Returns:
             Updated AutomationState with results
         """
-        print("=" * 80)
-        print(f"🖥️  STARTING DESKTOP AUTOMATION")
-        print("=" * 80)
-        print(f"📁 Executable: {state['exe_path']}")
-        print(f"📋 Total steps: {len(state['automation_steps'])}")
-        print("=" * 80)
+        logger.info("=" * 80)
+        logger.info("🖥️  STARTING DESKTOP AUTOMATION")
+        logger.info("=" * 80)
+        logger.info("📁 Executable: %s", state['exe_path'])
+        logger.info("📋 Total steps: %s", len(state['automation_steps']))
+        logger.info("=" * 80)
         
         try:
+            # Elements and windows resolved in an earlier run belong to a process that is gone
+            self.element_detector.invalidate()
+            
             # Step 1: Launch the executable
             process = self.window_manager.launch_application(state['exe_path'])
             if not process:
                 error_msg = f"Failed to launch application: {state['exe_path']}"
-                print(f"❌ {error_msg}")
-                return {
-                    **state,
-                    'automation_result': error_msg,
-                    'automation_success': False
-                }
+                logger.error("❌ %s", error_msg)
+                return self._finish(state, error_msg, False)
             
-            print(f"✅ Application launched successfully")
-            time.sleep(2)  # Give app time to fully load
+            logger.info("✅ Application launched successfully")
+            _wait_until_ready(timeout=2.0)  # Returns as soon as the app has taken focus
             
             # Step 2: Process each automation step
             processed_steps = 0
             skipped_steps = 0
+            steps = self._compile_steps(state['automation_steps'])
+            self._prefetch = None
             
-            for i, step in enumerate(state['automation_steps']):
+            for i, step in enumerate(steps):
                 step_num = i + 1
-                action_type = step.get('event_action_type', 'unknown')
-                field_name = step.get('field_name', '')
+                field_name = step.field
                 
-                print(f"\n📍 Step {step_num}/{len(state['automation_steps'])}: {action_type} on '{field_name}'")
+                logger.info("\n📍 Step %s/%s: %s on '%s'", step_num, len(steps), step.action or 'unknown', field_name)
                 
-                # Skip steps with field_name = "nan"
-                if field_name.lower() == 'nan':
-                    print(f"⏭️  Skipping step {step_num} - field_name is 'nan'")
+                # Skip steps with field_name = "nan" (or window_name = "nan" for element steps)
+                if step.skip:
+                    logger.info("⏭️  Skipping step %s - %s is 'nan'", step_num, step.skip)
                     skipped_steps += 1
                     continue
                 
-                # Execute the step with retry logic
+                # An unknown action would only fail after a full element search and a retry
+                if step.action not in _VALID_ACTIONS:
+                    error_msg = f"Unknown action type '{step.action}' in step {step_num}: {state['automation_steps'][i]}"
+                    logger.error("❌ %s", error_msg)
+                    return self._finish(state, error_msg, False)
+                
+                # Start resolving the next step's element, then execute this one with retry logic
+                self._prefetch_step(steps[i + 1] if i + 1 < len(steps) else None)
                 success = self._execute_step_with_retry(step, step_num)
                 if not success:
-                    error_msg = f"Failed to execute step {step_num}: {step}"
-                    print(f"❌ {error_msg}")
-                    print(f"\n📊 AUTOMATION SUMMARY:")
-                    print(f"   ✅ Processed: {processed_steps}")
-                    print(f"   ⏭️  Skipped: {skipped_steps}")
-                    print(f"   ❌ Failed at step: {step_num}")
-                    return {
-                        **state,
-                        'automation_result': error_msg,
-                        'automation_success': False
-                    }
+                    error_msg = f"Failed to execute step {step_num}: {state['automation_steps'][i]}"
+                    logger.error("❌ %s", error_msg)
+                    logger.info("\n📊 AUTOMATION SUMMARY:")
+                    logger.info("   ✅ Processed: %s", processed_steps)
+                    logger.info("   ⏭️  Skipped: %s", skipped_steps)
+                    logger.info("   ❌ Failed at step: %s", step_num)
+                    return self._finish(state, error_msg, False)
                 
                 processed_steps += 1
-                time.sleep(0.5)  # Small delay between steps
+                _wait_until_ready()  # Let focus settle before the next step
             
             # Success!
             success_msg = f"Desktop automation completed successfully! Processed: {processed_steps}, Skipped: {skipped_steps}"
-            print(f"\n🎉 {success_msg}")
-            print("=" * 80)
+            logger.info("\n🎉 %s", success_msg)
+            logger.info("=" * 80)
             
-            return {
-                **state,
-                'automation_result': success_msg,
-                'automation_success': True
-            }
+            return self._finish(state, success_msg, True)
             
         except Exception as e:
             error_msg = f"Automation failed with exception: {str(e)}"
-            print(f"\n💥 {error_msg}")
-            print("=" * 80)
-            return {
-                **state,
-                'automation_result': error_msg,
-                'automation_success': False
-            }
+            logger.error("\n💥 %s", error_msg)
+            logger.info("=" * 80)
+            return self._finish(state, error_msg, False)
+    
+    @staticmethod
+    def _finish(state: AutomationState, result: str, success: bool) -> AutomationState:
+        """Record the outcome on state in place and hand the same dict back"""
+        state['automation_result'] = result
+        state['automation_success'] = success
+        return state
     
-    def _execute_step_with_retry(self, step: Dict[str, Any], step_num: int) -> bool:
+    def _compile_steps(self, steps: List[Dict[str, Any]]) -> List[CompiledStep]:
+        """Normalize raw step dicts once so the run loop only does attribute access"""
+        compiled = []
+        for step in steps:
+            action = str(step.get('event_action_type', '')).lower()
+            window = str(step.get('window_name', ''))
+            field_name = str(step.get('field_name', ''))
+            # Spreadsheet exports leave 'nan' in empty cells; decided here instead of per use
+            if field_name.lower() == 'nan':
+                skip = 'field_name'
+            elif action != 'windowactivate' and window.lower() == 'nan':
+                skip = 'window_name'
+            else:
+                skip = None
+            compiled.append(CompiledStep(
+                action=sys.intern(action),
+                window=sys.intern(window),
+                field=sys.intern(field_name),
+                ftype=sys.intern(str(step.get('field_type', ''))),
+                data=str(step.get('Data', '')),
+                key=str(step.get('SpecialKeyWithData', '')),
+                skip=skip,
+            ))
+        return compiled
+    
+    def _execute_step_with_retry(self, step: CompiledStep, step_num: int) -> bool:
         """Execute a single step with one retry on failure"""
+        element = None
         for attempt in range(2):  # Original attempt + 1 retry
             try:
                 if attempt > 0:
-                    print(f"🔄 Retry attempt {attempt} for step {step_num}")
+                    logger.info("🔄 Retry attempt %s for step %s", attempt, step_num)
                 
-                success = self._execute_single_step(step)
+                if step.action == 'windowactivate':
+                    success = self._activate_step(step)
+                else:
+                    # A failed action retries on the element already found; only a failed find searches again
+                    if element is None:
+                        element = self._find_step_element(step)
+                    success = element is not None and self._act_on_element(step, element)
                 if success:
                     if attempt > 0:
-                        print(f"✅ Step {step_num} succeeded on retry")
+                        logger.info("✅ Step %s succeeded on retry", step_num)
                     else:
-                        print(f"✅ Step {step_num} completed successfully")
+                        logger.info("✅ Step %s completed successfully", step_num)
                     return True
                     
             except Exception as e:
-                print(f"⚠️  Step execution error (attempt {attempt + 1}): {str(e)}")
+                logger.warning("⚠️  Step execution error (attempt %s): %s", attempt + 1, e)
                 
             if attempt == 0:
-                time.sleep(1)  # Wait before retry
+                _wait_until_ready()  # Wait for the UI to settle before retry
         
-        print(f"❌ Step {step_num} failed after retry")
+        logger.error("❌ Step %s failed after retry", step_num)
         return False
     
-    def _execute_single_step(self, step: Dict[str, Any]) -> bool:
-        """Execute a single automation step"""
-        action_type = step.get('event_action_type', '').lower()
-        window_name = step.get('window_name', '')
-        field_name = step.get('field_name', '')
+    def _activate_step(self, step: CompiledStep) -> bool:
+        """Special case: window activation"""
+        self.action_executor.reset_focus()
+        return self.window_manager.activate_window(step.window or step.field)
+    
+    def _prefetch_step(self, step: Optional[CompiledStep]) -> None:
+        """Submit a background probe for step's element (skipped for window activation and 'nan' steps)"""
+        if step is None or step.action not in ActionExecutor._ACTIONS or step.skip:
+            return
+        future = self._prefetch_pool.submit(self.element_detector.probe_element,
+                                            step.window, step.field, step.ftype)
+        self._prefetch = (step, future)
+    
+    def _take_prefetched(self, step: CompiledStep) -> Optional[Element]:
+        """Element resolved ahead of time for step, if the probe found one that still exists"""
+        if self._prefetch is None or self._prefetch[0] is not step:
+            return None
+        future = self._prefetch[1]
+        self._prefetch = None
+        try:
+            element = future.result()  # usually done already; at worst one search pass remains
+        except Exception:
+            return None
+        if element is None:
+            return None
         
-        # Special case: window activation
-        if action_type == 'windowactivate':
-            return self.window_manager.activate_window(window_name or field_name)
+        # The previous step's action may have rebuilt the UI since the probe ran
+        return element if element.exists() else None
+    
+    def _find_step_element(self, step: CompiledStep) -> Optional[Element]:
+        """Locate the step's target element"""
+        element = self._take_prefetched(step)
+        if element is not None:
+            logger.info("✅ Using prefetched element: %s", step.field)
+            return element
         
-        # For other actions, find the element first (with AccessibleName support)
         element = self.element_detector.find_element(
-            window_name=window_name,
-            field_name=field_name,
-            field_type=step.get('field_type', ''),
+            window_name=step.window,
+            field_name=step.field,
+            field_type=step.ftype,
             timeout=30
         )
         
         if not element:
-            print(f"❌ Element not found: {field_name}")
-            return False
-        
-        # Execute the action
+            logger.error("❌ Element not found: %s", step.field)
+            return None
+        return element
+    
+    def _act_on_element(self, step: CompiledStep, element: Element) -> bool:
+        """Execute the step's action on an already located element"""
         return self.action_executor.execute_action(
             element=element,
-            action_type=action_type,
-            data=step.get('Data', ''),
-            special_key=step.get('SpecialKeyWithData', '')
+            action_type=step.action,
+            data=step.data,
+            special_key=step.key
         )
 
 
@@ -1067,13 +2173,13 @@ class DesktopAutomationNode:
 # CONVENIENCE FUNCTIONS AND EXPORTS
 # =============================================================================
 
-def create_automation_node(openai_api_key: Optional[str] = None, openai_model: str = "gpt-4") -> DesktopAutomationNode:
+def create_automation_node(openai_api_key: Optional[str] = None, openai_model: str = "gpt-4o-mini") -> DesktopAutomationNode:
     """
     Convenience function to create a desktop automation node
     
     Args:
         openai_api_key: Optional OpenAI API key for LLM fallback
-        openai_model: OpenAI model to use (default: gpt-4)
+        openai_model: OpenAI model to use (default: gpt-4o-mini)
         
     Returns:
         Configured DesktopAutomationNode instance
@@ -1104,6 +2210,7 @@ def create_sample_state(exe_path: str, automation_steps: List[Dict[str, Any]]) -
 __all__ = [
     'DesktopAutomationNode',
     'AutomationState', 
+    'Element',
     'WindowManager',
     'ElementDetector',
     'ActionExecutor',
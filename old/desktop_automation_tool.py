@@ -1,23 +1,168 @@
+import os
+import re
+import ctypes
+import shelve
 import time
+import hashlib
 import subprocess
+import threading
 import pyautogui
 import easyocr
 import numpy as np
 from PIL import Image
 from typing import List, Dict, Any, Optional, Tuple
 from dataclasses import dataclass
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 from langgraph.graph import StateGraph, END
 from langgraph.graph.message import add_messages
 from typing_extensions import Annotated, TypedDict
 import logging
 
+try:
+    import win32gui
+    import win32process
+    WIN32_AVAILABLE = True
+except ImportError:
+    WIN32_AVAILABLE = False
+
+try:
+    import mss
+    MSS_AVAILABLE = True
+except ImportError:
+    MSS_AVAILABLE = False
+
+try:
+    import xxhash
+    XXHASH_AVAILABLE = True
+except ImportError:
+    XXHASH_AVAILABLE = False
+
+try:
+    import ahocorasick
+    AHOCORASICK_AVAILABLE = True
+except ImportError:
+    AHOCORASICK_AVAILABLE = False
+
+try:
+    import cv2
+    CV2_AVAILABLE = True
+except ImportError:
+    CV2_AVAILABLE = False
+
+# SendInput keyboard injection (Windows only)
+INPUT_KEYBOARD = 1
+KEYEVENTF_KEYUP = 0x0002
+KEYEVENTF_UNICODE = 0x0004
+VK_RETURN = 0x0D
+
+class MOUSEINPUT(ctypes.Structure):
+    _fields_ = [("dx", ctypes.c_long), ("dy", ctypes.c_long), ("mouseData", ctypes.c_ulong),
+                ("dwFlags", ctypes.c_ulong), ("time", ctypes.c_ulong), ("dwExtraInfo", ctypes.c_size_t)]
+
+class KEYBDINPUT(ctypes.Structure):
+    _fields_ = [("wVk", ctypes.c_ushort), ("wScan", ctypes.c_ushort), ("dwFlags", ctypes.c_ulong),
+                ("time", ctypes.c_ulong), ("dwExtraInfo", ctypes.c_size_t)]
+
+class _INPUTUNION(ctypes.Union):
+    _fields_ = [("mi", MOUSEINPUT), ("ki", KEYBDINPUT)]
+
+class INPUT(ctypes.Structure):
+    _fields_ = [("type", ctypes.c_ulong), ("union", _INPUTUNION)]
+
+_user32 = ctypes.windll.user32 if hasattr(ctypes, "windll") else None
+
+def _send_unicode(text: str):
+    """Type text with one SendInput call: a Unicode key down/up pair per UTF-16 unit"""
+    events = []
+    for ch in text:
+        if ch == "\n":
+            # Unicode newlines are ignored by most edit controls; press Enter instead
+            events.append((VK_RETURN, 0, 0))
+            events.append((VK_RETURN, 0, KEYEVENTF_KEYUP))
+            continue
+        encoded = ch.encode("utf-16-le")
+        for i in range(0, len(encoded), 2):
+            unit = int.from_bytes(encoded[i:i + 2], "little")
+            events.append((0, unit, KEYEVENTF_UNICODE))
+            events.append((0, unit, KEYEVENTF_UNICODE | KEYEVENTF_KEYUP))
+    if not events:
+        return
+    
+    inputs = (INPUT * len(events))()
+    for slot, (vk, scan, flags) in zip(inputs, events):
+        slot.type = INPUT_KEYBOARD
+        slot.union.ki.wVk = vk
+        slot.union.ki.wScan = scan
+        slot.union.ki.dwFlags = flags
+    sent = _user32.SendInput(len(inputs), inputs, ctypes.sizeof(INPUT))
+    if sent != len(inputs):
+        raise ctypes.WinError()
+
 # Configure logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
 # Configure pyautogui
 pyautogui.FAILSAFE = True
-pyautogui.PAUSE = 1
+# No blanket pause after every call; actions wait for the screen to settle instead
+pyautogui.PAUSE = 0
+
+# Number of distinct screens whose OCR results are kept
+OCR_CACHE_SIZE = 16
+
+# OCR results persisted across runs, keyed by window title, crop size and a 16x16
+# dHash of the crop. Hashes within DHASH_MAX_DISTANCE differing bits are candidates;
+# a hit must also match the stored thumbnail within THUMB_MAX_MEAN_DIFF grey levels.
+# Entries written under another OCR_DISK_CACHE_VERSION are dropped on open, and only
+# the newest OCR_DISK_CACHE_MAX_ENTRIES are kept.
+CACHE_DIR = os.path.join(os.path.expanduser("~"), ".cache", "desktop_auto")
+OCR_DISK_CACHE_PATH = os.path.join(CACHE_DIR, "ocr.db")
+OCR_DISK_CACHE_VERSION = 2
+OCR_DISK_CACHE_MAX_ENTRIES = 256
+DHASH_SIZE = 16
+DHASH_MAX_DISTANCE = 1
+THUMB_SIZE = 64
+THUMB_MAX_MEAN_DIFF = 2.0
+
+# Screenshots are downscaled to this long side before OCR
+OCR_MAX_SIDE = 1280
+
+# readtext settings for axis-aligned UI text: no paragraph grouping and a
+# detector canvas capped at the downscaled screenshot size
+READTEXT_KWARGS = dict(detail=1, paragraph=False, canvas_size=OCR_MAX_SIDE, mag_ratio=1.0,
+                       text_threshold=0.7, low_text=0.4, batch_size=8, workers=0)
+
+# Polling used in place of fixed sleeps
+WINDOW_WAIT_TIMEOUT = 10.0
+SCREEN_STABLE_TIMEOUT = 2.0
+POLL_INTERVAL = 0.05
+
+# Grayscale element templates, <field name>.png; learned from OCR hits and kept
+# in the user cache unless DesktopAutomationTool is given another directory
+TEMPLATE_DIR = os.path.join(CACHE_DIR, "templates")
+TEMPLATE_MATCH_THRESHOLD = 0.85
+
+# EasyOCR reader shared by every tool instance in the process
+_READER = None
+_READER_LOCK = threading.Lock()
+# Builds the reader in the background while the application launches
+_READER_POOL = ThreadPoolExecutor(max_workers=1, thread_name_prefix="ocr-reader")
+
+def _get_reader():
+    """Return the shared EasyOCR reader, building and warming it up on first use"""
+    global _READER
+    with _READER_LOCK:
+        if _READER is None:
+            import torch
+            gpu = torch.cuda.is_available()
+            logger.info(f"Initializing EasyOCR reader (gpu={gpu})...")
+            # quantize applies torch dynamic int8 quantization on the CPU path
+            reader = easyocr.Reader(['en'], gpu=gpu, quantize=True, cudnn_benchmark=gpu)
+            # Prime model loading and kernel selection before the first real screen
+            reader.readtext(np.zeros((600, 800, 3), dtype=np.uint8), **READTEXT_KWARGS)
+            _READER = reader
+    return _READER
 
 @dataclass
 class AutomationStep:
@@ -27,6 +172,46 @@ class AutomationStep:
     special_key_with_data: str
     data: str
 
+@dataclass
+class OcrIndex:
+    """Column-wise view of one readtext result list"""
+    centers: np.ndarray      # (N, 2) int32 box centers
+    boxes: np.ndarray        # (N, 4) int32 left, top, right, bottom
+    confidences: np.ndarray  # (N,) float
+    texts: List[str]         # lowercased detected text
+    
+    @classmethod
+    def from_results(cls, results: list, scale: float = 1.0) -> "OcrIndex":
+        """Build from readtext output of an image resized by scale"""
+        if not results:
+            return cls(np.empty((0, 2), np.int32), np.empty((0, 4), np.int32), np.empty(0), [])
+        
+        bboxes = np.asarray([r[0] for r in results], dtype=np.float32)  # (N, 4, 2)
+        if scale != 1.0:
+            bboxes /= scale
+        boxes = np.concatenate([bboxes.min(axis=1), bboxes.max(axis=1)], axis=1).astype(np.int32)
+        return cls(
+            centers=bboxes.mean(axis=1).astype(np.int32),
+            boxes=np.maximum(boxes, 0),
+            confidences=np.asarray([r[2] for r in results], dtype=np.float32),
+            texts=[r[1].lower() for r in results],
+        )
+
+@dataclass
+class StepColumns:
+    """Column-wise copy of the run's steps, indexed by step number"""
+    field_names: List[str]
+    action_types: List[str]
+    datas: List[str]
+    
+    @classmethod
+    def from_steps(cls, steps: List[Dict[str, Any]]) -> "StepColumns":
+        return cls(
+            field_names=[s["field_name"] for s in steps],
+            action_types=[s["event_action_type"] for s in steps],
+            datas=[s.get("data", "") for s in steps],
+        )
+
 class AutomationState(TypedDict):
     exe_path: str
     steps: List[Dict[str, Any]]
@@ -36,11 +221,30 @@ class AutomationState(TypedDict):
     max_retries: int
     ocr_reader: Any
     process: Any
+    hwnd: Optional[int]
+    cached_ocr_screen_hash: bytes
+    cached_ocr_matches: Dict[str, Tuple[int, int]]
+    step_columns: StepColumns
 
 class DesktopAutomationTool:
-    def __init__(self):
+    def __init__(self, templates_dir: Optional[str] = None):
+        self.templates_dir = templates_dir or TEMPLATE_DIR
         self.ocr_reader = None
         self.max_retries = 1
+        self._reader_future = _READER_POOL.submit(_get_reader)
+        # Screenshot digest -> indexed readtext results, least recently used first
+        self._ocr_cache: "OrderedDict[bytes, OcrIndex]" = OrderedDict()
+        # Persistent OCR cache, opened on first use; (title, height, width) -> known dHashes
+        self._ocr_disk_cache = None
+        self._disk_hashes: Dict[Tuple[str, int, int], List[int]] = {}
+        # Stored keys, oldest first, for evicting past OCR_DISK_CACHE_MAX_ENTRIES
+        self._disk_order: List[str] = []
+        # In-memory screen grabber; pyautogui.screenshot() is the fallback
+        self._sct = mss.mss() if MSS_AVAILABLE else None
+        # Field name -> grayscale template, None when no template exists
+        self._templates: Dict[str, Optional[np.ndarray]] = {}
+        # Aho-Corasick automaton over the run's lowercased field names
+        self._field_automaton = None
         self.setup_graph()
     
     def setup_graph(self):
@@ -104,17 +308,19 @@ class DesktopAutomationTool:
         logger.info("Initializing automation...")
         
         try:
-            # Initialize OCR reader
-            if not self.ocr_reader:
-                logger.info("Initializing EasyOCR reader...")
-                self.ocr_reader = easyocr.Reader(['en'], gpu=False)
-            
+            # The OCR reader is still building; launch_application collects it
             state["ocr_reader"] = self.ocr_reader
             state["current_step"] = 0
             state["retry_count"] = 0
             state["max_retries"] = self.max_retries
             state["error_message"] = ""
             state["process"] = None
+            state["hwnd"] = None
+            state["cached_ocr_screen_hash"] = b""
+            state["cached_ocr_matches"] = {}
+            # Nodes read step fields from these columns by step index
+            state["step_columns"] = StepColumns.from_steps(state["steps"])
+            self._build_field_automaton(state["step_columns"].field_names)
             
             logger.info("Automation initialized successfully")
             return state
@@ -131,19 +337,34 @@ class DesktopAutomationTool:
         
         try:
             # Launch the application
+            previous_foreground = win32gui.GetForegroundWindow() if WIN32_AVAILABLE else None
             process = subprocess.Popen([exe_path])
             state["process"] = process
             
             # Wait for application to launch
-            time.sleep(3)
+            if WIN32_AVAILABLE:
+                state["hwnd"] = self._wait_for_window(process, previous_foreground)
+            else:
+                time.sleep(3)
             
             logger.info("Application launched successfully")
-            return state
             
         except Exception as e:
             state["error_message"] = f"Failed to launch application: {str(e)}"
             logger.error(state["error_message"])
             return state
+        
+        try:
+            # Usually finished by now: the reader was built during the launch wait
+            if not self.ocr_reader:
+                self.ocr_reader = self._reader_future.result()
+            state["ocr_reader"] = self.ocr_reader
+            
+        except Exception as e:
+            state["error_message"] = f"Failed to initialize OCR reader: {str(e)}"
+            logger.error(state["error_message"])
+        
+        return state
     
     def process_step(self, state: AutomationState) -> AutomationState:
         """Process the current automation step"""
@@ -151,33 +372,38 @@ class DesktopAutomationTool:
         steps = state["steps"]
         
         if current_step < len(steps):
-            step_data = steps[current_step]
-            logger.info(f"Processing step {current_step + 1}/{len(steps)}: {step_data['field_name']}")
-            state["current_step_data"] = step_data
+            logger.info(f"Processing step {current_step + 1}/{len(steps)}: {state['step_columns'].field_names[current_step]}")
+            state["current_step_data"] = steps[current_step]
             state["retry_count"] = 0
         
         return state
     
     def find_element(self, state: AutomationState) -> AutomationState:
         """Find element using text search or OCR"""
-        step_data = state["current_step_data"]
-        field_name = step_data["field_name"]
+        columns = state["step_columns"]
+        field_name = columns.field_names[state["current_step"]]
+        
+        # Window activation matches by title and never uses coordinates
+        if columns.action_types[state["current_step"]] == "windowActivate":
+            state["element_coords"] = (0, 0)
+            state["element_found"] = True
+            return state
         
         logger.info(f"Searching for element: {field_name}")
         
         try:
-            # First try: Direct text search using pyautogui
+            # First try: template match against a stored image of the element
             element_coords = self._find_element_by_text(field_name)
             
             if element_coords:
                 state["element_coords"] = element_coords
                 state["element_found"] = True
-                logger.info(f"Element found using text search at coordinates: {element_coords}")
+                logger.info(f"Element found using template match at coordinates: {element_coords}")
                 return state
             
             # Second try: OCR-based search
-            logger.info("Text search failed, trying OCR...")
-            element_coords = self._find_element_by_ocr(field_name, state["ocr_reader"])
+            logger.info("No template match, trying OCR...")
+            element_coords = self._find_element_by_ocr(field_name, state)
             
             if element_coords:
                 state["element_coords"] = element_coords
@@ -198,70 +424,316 @@ class DesktopAutomationTool:
             return state
     
     def _find_element_by_text(self, text: str) -> Optional[Tuple[int, int]]:
-        """Try to find element using pyautogui's text search capabilities"""
+        """Try to find element by matching a stored template of it on screen"""
+        if not CV2_AVAILABLE:
+            return None
+        
         try:
-            # Take screenshot and search for text
-            screenshot = pyautogui.screenshot()
+            template = self._load_template(text)
+            if template is None:
+                return None
             
-            # Simple approach: try to locate text on screen
-            # Note: This is a basic implementation - pyautogui doesn't have built-in text search
-            # In a real implementation, you might want to use image templates or other methods
-            return None
+            screenshot_np, offset = self._crop_to_foreground(self._grab())
+            screen_gray = cv2.cvtColor(screenshot_np, cv2.COLOR_RGB2GRAY)
+            height, width = template.shape
+            if screen_gray.shape[0] < height or screen_gray.shape[1] < width:
+                return None
+            
+            scores = cv2.matchTemplate(screen_gray, template, cv2.TM_CCOEFF_NORMED)
+            _, max_val, _, max_loc = cv2.minMaxLoc(scores)
+            if max_val <= TEMPLATE_MATCH_THRESHOLD:
+                return None
+            
+            return (offset[0] + max_loc[0] + width // 2, offset[1] + max_loc[1] + height // 2)
             
         except Exception as e:
-            logger.warning(f"Text search failed: {str(e)}")
+            logger.warning(f"Template match failed: {str(e)}")
             return None
     
-    def _find_element_by_ocr(self, text: str, ocr_reader) -> Optional[Tuple[int, int]]:
+    def _find_element_by_ocr(self, text: str, state: AutomationState) -> Optional[Tuple[int, int]]:
         """Find element using OCR"""
         try:
-            # Take screenshot
-            screenshot = pyautogui.screenshot()
-            screenshot_np = np.array(screenshot)
-            
-            # Use OCR to find text
-            results = ocr_reader.readtext(screenshot_np)
+            # Take screenshot, cropped to the foreground window
+            screenshot_np, offset = self._crop_to_foreground(self._grab())
+            screen_hash = self._screen_digest(screenshot_np, offset)
             
-            # Search for matching text
-            for (bbox, detected_text, confidence) in results:
-                if confidence > 0.5 and text.lower() in detected_text.lower():
-                    # Calculate center of bounding box
-                    x_coords = [point[0] for point in bbox]
-                    y_coords = [point[1] for point in bbox]
-                    center_x = int(sum(x_coords) / len(x_coords))
-                    center_y = int(sum(y_coords) / len(y_coords))
-                    
-                    return (center_x, center_y)
+            # One OCR pass per screen state resolves every remaining step's
+            # field name; later steps on the same screen are dict lookups
+            if screen_hash != state.get("cached_ocr_screen_hash") or text not in state["cached_ocr_matches"]:
+                index = self._read_screen_text(screenshot_np, screen_hash, state["ocr_reader"])
+                pending = set(state["step_columns"].field_names[state["current_step"]:])
+                pending.add(text)
+                boxes: Dict[str, Tuple[int, int, int, int]] = {}
+                state["cached_ocr_matches"] = self._match_texts(index, pending, offset, boxes)
+                state["cached_ocr_screen_hash"] = screen_hash
+                if text in boxes:
+                    self._save_template(text, screenshot_np, boxes[text])
             
-            return None
+            return state["cached_ocr_matches"].get(text)
             
         except Exception as e:
             logger.warning(f"OCR search failed: {str(e)}")
             return None
     
+    def _screen_digest(self, screenshot_np: np.ndarray, offset: Tuple[int, int]) -> bytes:
+        """Digest of the (contiguous) pixel buffer and its screen offset, hashed in place"""
+        digest = xxhash.xxh3_64() if XXHASH_AVAILABLE else hashlib.md5()
+        digest.update(memoryview(screenshot_np).cast('B'))
+        digest.update(bytes(repr(offset), "ascii"))
+        return digest.digest()
+    
+    def _grab(self) -> np.ndarray:
+        """Capture the primary monitor as an RGB array"""
+        if self._sct is not None:
+            shot = self._sct.grab(self._sct.monitors[1])
+            return np.frombuffer(shot.rgb, dtype=np.uint8).reshape(shot.height, shot.width, 3)
+        
+        # Read-only view of the PIL buffer; readtext does not write to it
+        return np.asarray(pyautogui.screenshot())
+    
+    def _crop_to_foreground(self, screenshot_np: np.ndarray) -> Tuple[np.ndarray, Tuple[int, int]]:
+        """Crop to the foreground window rectangle; returns the crop and its screen offset"""
+        full = (np.ascontiguousarray(screenshot_np), (0, 0))
+        if not WIN32_AVAILABLE:
+            return full
+        
+        try:
+            left, top, right, bottom = win32gui.GetWindowRect(win32gui.GetForegroundWindow())
+        except Exception:
+            return full
+        
+        height, width = screenshot_np.shape[:2]
+        left, top = max(left, 0), max(top, 0)
+        right, bottom = min(right, width), min(bottom, height)
+        if right - left <= 0 or bottom - top <= 0:
+            return full
+        
+        return np.ascontiguousarray(screenshot_np[top:bottom, left:right]), (left, top)
+    
+    def _template_path(self, text: str) -> str:
+        return os.path.join(self.templates_dir, re.sub(r"[^\w\-]+", "_", text) + ".png")
+    
+    def _load_template(self, text: str) -> Optional[np.ndarray]:
+        """Return the grayscale template for a field name, reading it from disk once"""
+        if text not in self._templates:
+            path = self._template_path(text)
+            self._templates[text] = cv2.imread(path, cv2.IMREAD_GRAYSCALE) if os.path.exists(path) else None
+        return self._templates[text]
+    
+    def _save_template(self, text: str, screenshot_np: np.ndarray, box: Tuple[int, int, int, int]):
+        """Store the OCR-matched region as the template for later runs"""
+        if not CV2_AVAILABLE or self._load_template(text) is not None:
+            return
+        
+        left, top, right, bottom = box
+        template = cv2.cvtColor(np.ascontiguousarray(screenshot_np[top:bottom, left:right]), cv2.COLOR_RGB2GRAY)
+        if template.size == 0:
+            return
+        
+        try:
+            os.makedirs(self.templates_dir, exist_ok=True)
+            cv2.imwrite(self._template_path(text), template)
+            self._templates[text] = template
+        except Exception as e:
+            logger.warning(f"Could not save template for '{text}': {str(e)}")
+    
+    def _match_texts(self, index: OcrIndex, texts, offset: Tuple[int, int] = (0, 0),
+                     boxes: Optional[Dict[str, Tuple[int, int, int, int]]] = None) -> Dict[str, Optional[Tuple[int, int]]]:
+        """Map each text to the screen center of the first confident OCR box containing it
+        
+        When boxes is given it also receives each match's bounding box in image coordinates.
+        """
+        needles = {text: text.lower() for text in texts}
+        matches: Dict[str, Optional[Tuple[int, int]]] = dict.fromkeys(needles)
+        automaton = self._field_automaton
+        # Needles the automaton does not know fall back to substring checks
+        scanned = {text: needle for text, needle in needles.items()
+                   if automaton is None or needle not in automaton}
+        
+        for i in np.flatnonzero(index.confidences > 0.5):
+            detected_lower = index.texts[i]
+            found = [text for text, needle in scanned.items() if needle in detected_lower]
+            if automaton is not None:
+                found.extend(text for _, names in automaton.iter(detected_lower) for text in names)
+            
+            for text in found:
+                if text in needles:
+                    center_x, center_y = index.centers[i].tolist()
+                    matches[text] = (center_x + offset[0], center_y + offset[1])
+                    if boxes is not None:
+                        boxes[text] = tuple(index.boxes[i].tolist())
+                    del needles[text]
+                    scanned.pop(text, None)
+            if not needles:
+                break
+        
+        return matches
+    
+    def _build_field_automaton(self, field_names: List[str]):
+        """Compile every step's field name into one automaton for single-pass matching"""
+        self._field_automaton = None
+        if not AHOCORASICK_AVAILABLE:
+            return
+        
+        names_by_needle: Dict[str, List[str]] = {}
+        for field_name in field_names:
+            needle = field_name.lower()
+            if needle and field_name not in names_by_needle.setdefault(needle, []):
+                names_by_needle[needle].append(field_name)
+        if not names_by_needle:
+            return
+        
+        automaton = ahocorasick.Automaton()
+        for needle, names in names_by_needle.items():
+            automaton.add_word(needle, tuple(names))
+        automaton.make_automaton()
+        self._field_automaton = automaton
+    
+    def _read_screen_text(self, screenshot_np: np.ndarray, key: bytes, ocr_reader) -> OcrIndex:
+        """Run OCR on the screenshot, memoized by its pixel digest"""
+        index = self._ocr_cache.get(key)
+        if index is not None:
+            self._ocr_cache.move_to_end(key)
+            return index
+        
+        index = self._load_disk_cached(screenshot_np)
+        if index is not None:
+            self._remember_ocr(key, index)
+            return index
+        
+        scale = min(1.0, OCR_MAX_SIDE / max(screenshot_np.shape[:2]))
+        if scale < 1.0 and CV2_AVAILABLE:
+            image = cv2.resize(screenshot_np, None, fx=scale, fy=scale, interpolation=cv2.INTER_AREA)
+        else:
+            image, scale = screenshot_np, 1.0
+        
+        index = OcrIndex.from_results(ocr_reader.readtext(image, **READTEXT_KWARGS), scale)
+        self._remember_ocr(key, index)
+        self._store_disk_cached(screenshot_np, index)
+        return index
+    
+    def _remember_ocr(self, key: bytes, index: OcrIndex):
+        self._ocr_cache[key] = index
+        if len(self._ocr_cache) > OCR_CACHE_SIZE:
+            self._ocr_cache.popitem(last=False)
+    
+    # Persistent OCR cache
+    def _screen_signature(self, screenshot_np: np.ndarray) -> Tuple[int, np.ndarray]:
+        """dHash of the grayscale image shrunk to DHASH_SIZE rows, and a THUMB_SIZE thumbnail"""
+        gray = Image.fromarray(screenshot_np).convert("L")
+        pixels = np.asarray(gray.resize((DHASH_SIZE + 1, DHASH_SIZE), Image.BILINEAR), dtype=np.int16)
+        dhash = int.from_bytes(np.packbits(pixels[:, 1:] > pixels[:, :-1]).tobytes(), "big")
+        thumb = np.asarray(gray.resize((THUMB_SIZE, THUMB_SIZE), Image.BILINEAR), dtype=np.uint8)
+        return dhash, thumb
+    
+    def _foreground_title(self) -> str:
+        if not WIN32_AVAILABLE:
+            return ""
+        try:
+            return win32gui.GetWindowText(win32gui.GetForegroundWindow())
+        except Exception:
+            return ""
+    
+    @staticmethod
+    def _disk_key(title: str, height: int, width: int, dhash: int) -> str:
+        return f"v{OCR_DISK_CACHE_VERSION}|{height}x{width}|{dhash:x}|{title}"
+    
+    def _open_disk_cache(self):
+        if self._ocr_disk_cache is None:
+            os.makedirs(os.path.dirname(OCR_DISK_CACHE_PATH), exist_ok=True)
+            cache = self._ocr_disk_cache = shelve.open(OCR_DISK_CACHE_PATH)
+            order = [k for k in cache.get("__order__", []) if k in cache]
+            prefix = f"v{OCR_DISK_CACHE_VERSION}|"
+            for stored_key in list(cache.keys()):
+                if stored_key == "__order__":
+                    continue
+                if not stored_key.startswith(prefix):
+                    del cache[stored_key]  # Written by another cache version
+                elif stored_key not in order:
+                    order.append(stored_key)
+            self._disk_order = [k for k in order if k.startswith(prefix)]
+            self._disk_hashes = {}
+            for stored_key in self._disk_order:
+                _, size, dhash, title = stored_key.split("|", 3)
+                height, _, width = size.partition("x")
+                self._disk_hashes.setdefault((title, int(height), int(width)), []).append(int(dhash, 16))
+        return self._ocr_disk_cache
+    
+    def _close_disk_cache(self):
+        if self._ocr_disk_cache is not None:
+            self._ocr_disk_cache.close()
+            self._ocr_disk_cache = None
+    
+    def _load_disk_cached(self, screenshot_np: np.ndarray) -> Optional[OcrIndex]:
+        """Return stored OCR results for a visually identical screen of the same window and size"""
+        try:
+            cache = self._open_disk_cache()
+            title = self._foreground_title()
+            height, width = screenshot_np.shape[:2]
+            dhash, thumb = self._screen_signature(screenshot_np)
+            for known in self._disk_hashes.get((title, height, width), ()):
+                if bin(known ^ dhash).count("1") > DHASH_MAX_DISTANCE:
+                    continue
+                stored = cache.get(self._disk_key(title, height, width, known))
+                if stored is None:
+                    continue
+                # The dHash only narrows candidates; the thumbnail confirms the hit
+                if np.abs(stored[0].astype(np.int16) - thumb).mean() <= THUMB_MAX_MEAN_DIFF:
+                    return OcrIndex(*stored[1:])
+        except Exception as e:
+            logger.warning(f"OCR disk cache lookup failed: {str(e)}")
+        return None
+    
+    def _store_disk_cached(self, screenshot_np: np.ndarray, index: OcrIndex):
+        try:
+            cache = self._open_disk_cache()
+            title = self._foreground_title()
+            height, width = screenshot_np.shape[:2]
+            dhash, thumb = self._screen_signature(screenshot_np)
+            key = self._disk_key(title, height, width, dhash)
+            # Plain tuple rather than OcrIndex so entries load from any entry point
+            cache[key] = (thumb, index.centers, index.boxes, index.confidences, index.texts)
+            if key not in self._disk_order:
+                self._disk_order.append(key)
+                self._disk_hashes.setdefault((title, height, width), []).append(dhash)
+            while len(self._disk_order) > OCR_DISK_CACHE_MAX_ENTRIES:
+                oldest = self._disk_order.pop(0)
+                cache.pop(oldest, None)
+                _, size, old_hash, old_title = oldest.split("|", 3)
+                old_height, _, old_width = size.partition("x")
+                hashes = self._disk_hashes.get((old_title, int(old_height), int(old_width)), [])
+                if int(old_hash, 16) in hashes:
+                    hashes.remove(int(old_hash, 16))
+            cache["__order__"] = self._disk_order
+        except Exception as e:
+            logger.warning(f"OCR disk cache write failed: {str(e)}")
+    
     def execute_action(self, state: AutomationState) -> AutomationState:
         """Execute the specified action"""
-        step_data = state["current_step_data"]
+        step_index = state["current_step"]
         element_coords = state["element_coords"]
-        action_type = step_data["event_action_type"]
-        data = step_data.get("data", "")
+        columns = state["step_columns"]
+        action_type = columns.action_types[step_index]
+        data = columns.datas[step_index]
         
         logger.info(f"Executing action: {action_type} at coordinates: {element_coords}")
         
         try:
             if action_type == "windowActivate":
-                self._activate_window(step_data["field_name"])
+                self._activate_window(columns.field_names[step_index], state.get("hwnd"))
             elif action_type == "click":
                 pyautogui.click(element_coords[0], element_coords[1])
             elif action_type == "typeInto":
                 pyautogui.click(element_coords[0], element_coords[1])
-                time.sleep(0.5)
-                pyautogui.typewrite(data)
+                if _user32 is not None:
+                    _send_unicode(data)
+                else:
+                    pyautogui.typewrite(data)
             else:
                 raise ValueError(f"Unsupported action type: {action_type}")
             
-            # Wait after action
-            time.sleep(1)
+            # Wait for the action's effect to finish drawing
+            self._wait_for_screen_stable()
             
             state["action_success"] = True
             state["current_step"] += 1
@@ -274,26 +746,86 @@ class DesktopAutomationTool:
             logger.error(state["error_message"])
             return state
     
-    def _activate_window(self, window_title: str):
-        """Activate window by title"""
-        try:
-            import win32gui
-            import win32con
-            
-            def enum_windows_proc(hwnd, lParam):
-                if win32gui.IsWindowVisible(hwnd):
-                    window_text = win32gui.GetWindowText(hwnd)
-                    if window_title.lower() in window_text.lower():
-                        win32gui.SetForegroundWindow(hwnd)
-                        return False
-                return True
-            
-            win32gui.EnumWindows(enum_windows_proc, None)
+    def _wait_for_window(self, process: subprocess.Popen, previous_foreground, timeout: float = WINDOW_WAIT_TIMEOUT):
+        """Poll until the launched process shows a window or a new window takes the foreground"""
+        found = []
+        
+        def enum_windows_proc(hwnd, lParam):
+            if win32gui.IsWindowVisible(hwnd) and win32process.GetWindowThreadProcessId(hwnd)[1] == process.pid:
+                found.append(hwnd)
+                return False
+            return True
+        
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            try:
+                win32gui.EnumWindows(enum_windows_proc, None)
+            except Exception:
+                # EnumWindows reports the early stop from the callback as an error
+                pass
+            if found:
+                return found[0]
             
-        except ImportError:
+            # Launcher stubs hand off to another process; accept its window once it is in front
+            foreground = win32gui.GetForegroundWindow()
+            if foreground and foreground != previous_foreground and win32gui.IsWindowVisible(foreground):
+                return foreground
+            time.sleep(POLL_INTERVAL)
+        
+        logger.warning(f"No application window appeared within {timeout}s")
+        return None
+    
+    def _wait_for_screen_stable(self, timeout: float = SCREEN_STABLE_TIMEOUT, interval: float = 0.1):
+        """Return once two downsampled captures taken interval apart are identical"""
+        previous = self._grab()[::4, ::4]
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            time.sleep(interval)
+            current = self._grab()[::4, ::4]
+            if np.array_equal(previous, current):
+                return
+            previous = current
+    
+    def _activate_window(self, window_title: str, launched_hwnd: Optional[int] = None):
+        """Activate window by title, trying the launched window and an exact match before enumerating"""
+        if not WIN32_AVAILABLE:
             # Fallback: try to click on the window if we can find it
             logger.warning("win32gui not available, using fallback method")
             time.sleep(0.5)
+            return
+        
+        title_lower = window_title.lower()
+        if launched_hwnd and win32gui.IsWindow(launched_hwnd) \
+                and title_lower in win32gui.GetWindowText(launched_hwnd).lower():
+            win32gui.SetForegroundWindow(launched_hwnd)
+            return
+        
+        # FindWindow raises when no title matches exactly; substrings are left to EnumWindows
+        try:
+            hwnd = win32gui.FindWindow(None, window_title)
+        except win32gui.error:
+            hwnd = 0
+        if hwnd and win32gui.IsWindowVisible(hwnd):
+            win32gui.SetForegroundWindow(hwnd)
+            return
+        
+        found = []
+        
+        def enum_windows_proc(hwnd, lParam):
+            if win32gui.IsWindowVisible(hwnd):
+                window_text = win32gui.GetWindowText(hwnd)
+                if title_lower in window_text.lower():
+                    found.append(hwnd)
+                    return False
+            return True
+        
+        try:
+            win32gui.EnumWindows(enum_windows_proc, None)
+        except Exception:
+            # EnumWindows reports the early stop from the callback as an error
+            pass
+        if found:
+            win32gui.SetForegroundWindow(found[0])
     
     def handle_error(self, state: AutomationState) -> AutomationState:
         """Handle errors and retries"""
@@ -305,6 +837,7 @@ class DesktopAutomationTool:
     
     def complete_automation(self, state: AutomationState) -> AutomationState:
         """Complete the automation process"""
+        self._close_disk_cache()
         logger.info("Automation completed successfully!")
         return state
     
@@ -324,7 +857,7 @@ class DesktopAutomationTool:
         elif state["retry_count"] < state["max_retries"]:
             state["retry_count"] += 1
             logger.info(f"Retrying action (attempt {state['retry_count']}/{state['max_retries']})")
-            time.sleep(2)  # Pause before retry
+            self._wait_for_screen_stable()  # Let the screen settle before retry
             return "retry"
         else:
             return "error"
@@ -352,4 +885,8 @@ class DesktopAutomationTool:
             
         except Exception as e:
             logger.error(f"Automation failed: {str(e)}")
-            raise
\ No newline at end of file
+            raise
+        
+        finally:
+            # complete_automation closes it on success; the error path ends in a raise
+            self._close_disk_cache()
\ No newline at end of file
@@ -1,11 +1,20 @@
 import time
 import os
+import ctypes
+import json
 import hashlib
 import subprocess
+import atexit
+import queue
 import logging
+from logging.handlers import QueueHandler, QueueListener
+import re
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed, TimeoutError as FuturesTimeout
 from datetime import datetime
 from typing import List, Dict, Any, Optional, Tuple, Union
 from dataclasses import dataclass
+from functools import lru_cache
 from pathlib import Path
 
 import pyautogui
@@ -16,7 +25,11 @@ from PIL import Image
 import win32gui
 import win32con
 import win32api
+import win32ui
+import win32event
+import win32clipboard
 import win32com.client
+import pythoncom
 from win32com.client import Dispatch
 
 from langgraph.graph import StateGraph, END
@@ -24,7 +37,121 @@ from typing_extensions import TypedDict
 
 # Configure pyautogui
 pyautogui.FAILSAFE = True
-pyautogui.PAUSE = 0.5
+# No implicit pause per call (typewrite paused per keystroke); waits are explicit
+pyautogui.PAUSE = 0
+
+# Make sure OpenCV dispatches to its SIMD kernels
+cv2.setUseOptimized(True)
+
+# Template matches need a normalized squared difference below this
+TEMPLATE_MAX_SQDIFF = 0.2
+
+# Templates are captured this far around the element center; cached
+# coordinates are re-verified within this much extra slack
+TEMPLATE_MARGIN = 20
+CACHE_VERIFY_SLACK = 6
+
+# SpecialKeyWithData names -> pyautogui key names
+KEY_MAP = {
+    "Enter": "enter",
+    "Tab": "tab",
+    "Escape": "esc",
+    "Space": "space",
+    "Backspace": "backspace",
+    "Delete": "del",
+    "Home": "home",
+    "End": "end",
+    "PageUp": "pageup",
+    "PageDown": "pagedown",
+    "Up": "up",
+    "Down": "down",
+    "Left": "left",
+    "Right": "right",
+    **{f"F{i}": f"f{i}" for i in range(1, 13)},
+}
+MODIFIER_KEYS = {"Ctrl": "ctrl", "Alt": "alt", "Shift": "shift"}
+
+@lru_cache(maxsize=128)
+def _parse_hotkey(special_key: str) -> Tuple[str, ...]:
+    """pyautogui key names for a SpecialKeyWithData value, parsed once per distinct value"""
+    # Handle Ctrl/Alt/Shift combinations
+    modifier, sep, rest = special_key.partition("+")
+    if sep and modifier in MODIFIER_KEYS:
+        keys = [MODIFIER_KEYS.get(key) or KEY_MAP.get(key, key.lower()) for key in rest.split("+")]
+        return (MODIFIER_KEYS[modifier], *keys)
+    return (KEY_MAP.get(special_key, special_key.lower()),)
+
+# SendInput structures for batched Unicode typing
+INPUT_KEYBOARD = 1
+KEYEVENTF_KEYUP = 0x0002
+KEYEVENTF_UNICODE = 0x0004
+
+class MOUSEINPUT(ctypes.Structure):
+    _fields_ = [("dx", ctypes.c_long), ("dy", ctypes.c_long), ("mouseData", ctypes.c_ulong),
+                ("dwFlags", ctypes.c_ulong), ("time", ctypes.c_ulong), ("dwExtraInfo", ctypes.c_size_t)]
+
+class KEYBDINPUT(ctypes.Structure):
+    _fields_ = [("wVk", ctypes.c_ushort), ("wScan", ctypes.c_ushort), ("dwFlags", ctypes.c_ulong),
+                ("time", ctypes.c_ulong), ("dwExtraInfo", ctypes.c_size_t)]
+
+class _INPUTUNION(ctypes.Union):
+    _fields_ = [("mi", MOUSEINPUT), ("ki", KEYBDINPUT)]
+
+class INPUT(ctypes.Structure):
+    _fields_ = [("type", ctypes.c_ulong), ("union", _INPUTUNION)]
+
+# Upper bound on waiting for a launched application's first window
+LAUNCH_TIMEOUT = 15
+
+# typeInto text longer than this is pasted through the clipboard instead of typed
+PASTE_MIN_LENGTH = 10
+# Time given to the target to read the clipboard before the prior text is put back
+CLIPBOARD_RESTORE_DELAY = 0.2
+
+# UI Automation property and control type ids
+UIA_BoundingRectanglePropertyId = 30001
+UIA_ControlTypePropertyId = 30003
+UIA_NamePropertyId = 30005
+UIA_AutomationIdPropertyId = 30011
+UIA_IsOffscreenPropertyId = 30022
+UIA_ButtonControlTypeId = 50000
+UIA_EditControlTypeId = 50004
+UIA_HyperlinkControlTypeId = 50005
+TreeScope_Children = 2
+TreeScope_Descendants = 4
+
+# field_type -> UIA control type searched for it
+FIELD_CONTROL_TYPES = {
+    "push button": UIA_ButtonControlTypeId,
+    "editable text": UIA_EditControlTypeId,
+    "link": UIA_HyperlinkControlTypeId,
+}
+
+# "[PLACEHOLDER]" in a window_name stands for any text (including the whitespace
+# around it), "?" for any single character, and a run of spaces for any whitespace
+TITLE_TOKENS = re.compile(r"(\s*\[[A-Z_]+\]\s*)|(\?)|(\s+)")
+
+@lru_cache(maxsize=256)
+def _title_matcher(window_name: str):
+    """Predicate over lowercased window titles for a window_name, built once per name"""
+    needle = window_name.lower()
+    if "[" not in window_name and "?" not in window_name:
+        return lambda title: needle in title
+    parts = []
+    position = 0
+    for token in TITLE_TOKENS.finditer(window_name):
+        parts.append(re.escape(window_name[position:token.start()]))
+        placeholder, any_char, _ = token.groups()
+        parts.append(".*?" if placeholder else ".?" if any_char else r"\s+")
+        position = token.end()
+    parts.append(re.escape(window_name[position:]))
+    return re.compile("".join(parts), re.IGNORECASE).search
+
+class _ChildFound(Exception):
+    """Raised from an EnumChildWindows callback to stop at the first match"""
+    def __init__(self, hwnd: int):
+        super().__init__(hwnd)
+        self.hwnd = hwnd
 
 @dataclass
 class AutomationStep:
@@ -48,6 +175,7 @@ class AutomationState(TypedDict):
     ocr_reader: Any
     ui_automation: Any
     element_cache: Dict[str, Any]
+    ocr_bbox_cache: Dict[str, List[int]]
     current_window_handle: int
     
     # Template and logging
@@ -74,32 +202,72 @@ class EnhancedDesktopAutomation:
         # Setup logging
         self.setup_logging()
         
+        # (field_name, field_type) -> template file path
+        self._template_paths: Dict[Tuple[str, str], Path] = {}
+        # Template file stem -> grayscale template, decoded once
+        self._template_cache: Dict[str, np.ndarray] = {}
+        for template_path in self.templates_dir.glob("*.png"):
+            template = cv2.imread(str(template_path), 0)
+            if template is not None:
+                self._template_cache[template_path.stem] = template
+        
+        # Element coordinates found in earlier runs
+        self.coord_cache_path = self.logs_dir / "coord_cache.json"
+        self._coord_cache: Dict[str, Dict[str, Any]] = self._load_coord_cache()
+        
         # Initialize detection components
         self.ocr_reader = None
         self.ui_automation = None
+        # Per-thread UIA client and control type conditions; COM objects stay in their apartment
+        self._uia_local = threading.local()
+        # UIA, Win32 and template detection race on these workers
+        self._detect_pool = ThreadPoolExecutor(max_workers=3, initializer=self._init_detect_worker)
+        # Serializes use of the shared GDI capture surfaces across threads
+        self._gdi_lock = threading.Lock()
+        # Lowercased title -> hwnd of visible top-level windows, from the last enumeration
+        self._hwnd_index: Dict[str, int] = {}
+        # Step window_name -> hwnd it last resolved to
+        self._hwnd_by_name: Dict[str, int] = {}
+        # (width, height) -> reusable GDI capture surface
+        self._gdi_surfaces: Dict[Tuple[int, int], Tuple[Any, ...]] = {}
         
         # Setup workflow
         self.setup_graph()
     
+    @property
+    def ocr_reader_lazy(self):
+        """EasyOCR reader, loaded on first use since most runs never reach OCR"""
+        if self.ocr_reader is None:
+            self.ocr_reader = easyocr.Reader(['en'], gpu=False, quantize=True)
+        return self.ocr_reader
+    
     def setup_logging(self):
-        """Setup analytics logging"""
+        """Setup analytics logging
+        
+        Records are queued and written to the file by a background listener, so
+        steps never wait on disk I/O; the listener drains the queue at exit.
+        """
         log_file = self.logs_dir / "automation_analytics.log"
         
         # Create logger
         self.analytics_logger = logging.getLogger('automation_analytics')
         self.analytics_logger.setLevel(logging.INFO)
         
-        # Create file handler
-        file_handler = logging.FileHandler(log_file)
-        file_handler.setLevel(logging.INFO)
-        
-        # Create formatter
-        formatter = logging.Formatter('%(asctime)s - %(message)s')
-        file_handler.setFormatter(formatter)
-        
         # Add handler to logger
         if not self.analytics_logger.handlers:
-            self.analytics_logger.addHandler(file_handler)
+            # Create file handler
+            file_handler = logging.FileHandler(log_file)
+            file_handler.setLevel(logging.INFO)
+            
+            # Create formatter
+            formatter = logging.Formatter('%(asctime)s - %(message)s')
+            file_handler.setFormatter(formatter)
+            
+            log_queue = queue.Queue(-1)
+            listener = QueueListener(log_queue, file_handler)
+            listener.start()
+            atexit.register(listener.stop)
+            self.analytics_logger.addHandler(QueueHandler(log_queue))
     
     def setup_graph(self):
         """Setup the LangGraph workflow"""
@@ -153,10 +321,6 @@ class EnhancedDesktopAutomation:
     def initialize_automation(self, state: AutomationState) -> AutomationState:
         """Initialize the automation process"""
         try:
-            # Initialize OCR reader
-            if not self.ocr_reader:
-                self.ocr_reader = easyocr.Reader(['en'], gpu=False)
-            
             # Initialize UI Automation
             if not self.ui_automation:
                 self.ui_automation = Dispatch("UIAutomationCore.CUIAutomation")
@@ -165,6 +329,7 @@ class EnhancedDesktopAutomation:
                 "ocr_reader": self.ocr_reader,
                 "ui_automation": self.ui_automation,
                 "element_cache": {},
+                "ocr_bbox_cache": {},
                 "current_step": 0,
                 "retry_count": 0,
                 "max_retries": self.max_retries,
@@ -191,7 +356,7 @@ class EnhancedDesktopAutomation:
         
         try:
             process = subprocess.Popen([exe_path])
-            time.sleep(15)  # Wait for application to launch
+            self._wait_for_launch(process, state["steps"])
             
             self.analytics_logger.info(f"Application launched: {exe_path}")
             return state
@@ -200,6 +365,28 @@ class EnhancedDesktopAutomation:
             state["error_message"] = f"Failed to launch application: {str(e)}"
             return state
     
+    def _wait_for_launch(self, process: subprocess.Popen, steps: List[Dict[str, Any]]):
+        """Wait until the process is idle for input and the first step's window exists"""
+        deadline = time.time() + LAUNCH_TIMEOUT
+        try:
+            handle = win32api.OpenProcess(win32con.PROCESS_QUERY_INFORMATION | win32con.SYNCHRONIZE,
+                                          False, process.pid)
+            try:
+                win32event.WaitForInputIdle(handle, LAUNCH_TIMEOUT * 1000)
+            finally:
+                win32api.CloseHandle(handle)
+        except Exception:
+            # Console or already-exited launcher processes have no input queue to wait on
+            pass
+        
+        window_name = steps[0].get("window_name", "") if steps else ""
+        if not window_name:
+            return
+        while time.time() < deadline:
+            if self._find_window_by_name(window_name):
+                return
+            time.sleep(0.1)
+    
     def process_step(self, state: AutomationState) -> AutomationState:
         """Process the current automation step"""
         current_step = state["current_step"]
@@ -209,11 +396,6 @@ class EnhancedDesktopAutomation:
             step_data = steps[current_step]
             state["current_step_data"] = step_data
             state["retry_count"] = 0
-            
-            # Skip windowActivate steps as we handle window activation automatically
-            if step_data.get("event_action_type") == "windowActivate":
-                state["current_step"] += 1
-                return self.process_step(state)  # Process next step
         
         return state
     
@@ -225,11 +407,19 @@ class EnhancedDesktopAutomation:
         try:
             window_handle = self._find_window_by_name(window_name)
             if window_handle:
-                win32gui.SetForegroundWindow(window_handle)
-                win32gui.ShowWindow(window_handle, win32con.SW_RESTORE)
-                time.sleep(0.5)  # Wait for window activation
+                # Consecutive steps in one window skip re-activating it
+                if win32gui.GetForegroundWindow() != window_handle:
+                    win32gui.SetForegroundWindow(window_handle)
+                    win32gui.ShowWindow(window_handle, win32con.SW_RESTORE)
+                    time.sleep(0.5)  # Wait for window activation
                 
-                state["current_window_handle"] = window_handle
+                if window_handle != state["current_window_handle"]:
+                    state["current_window_handle"] = window_handle
+                    state["element_cache"] = {}
+                    try:
+                        self._prefetch_window_elements(window_handle, state)
+                    except Exception as e:
+                        self.analytics_logger.warning(f"Template prefetch failed: {str(e)}")
                 self.analytics_logger.info(f"Window activated: {window_name}")
                 return state
             else:
@@ -248,48 +438,69 @@ class EnhancedDesktopAutomation:
         field_type = step_data["field_type"]
         
         start_time = time.time()
+        cache_key = self._coord_cache_key(step_data.get("window_name", ""), field_name, field_type)
         
         try:
-            # Method 1: UI Automation
-            element_info = self._find_element_ui_automation(window_handle, field_name, field_type)
-            if element_info:
-                state.update({
-                    "element_coords": element_info["coords"],
-                    "element_handle": element_info.get("handle"),
-                    "element_found": True,
-                    "detection_method": "UI_Automation"
-                })
-                self._capture_template(element_info["coords"], field_name, field_type)
-                self._log_detection_success("UI_Automation", field_name, field_type, time.time() - start_time)
-                return state
+            # keyPress only sends keys to the focused window, so a run of keyPress steps on
+            # the same field keeps the element found for the first of them
+            current_step = state["current_step"]
+            if step_data.get("event_action_type") == "keyPress" and current_step and state["element_found"]:
+                previous = state["steps"][current_step - 1]
+                if previous.get("event_action_type") == "keyPress" and previous.get("field_name") == field_name \
+                        and previous.get("window_name") == step_data.get("window_name"):
+                    state["detection_method"] = "Previous_Step"
+                    self._log_detection_success("Previous_Step", field_name, field_type, time.time() - start_time)
+                    return state
+            
+            # Prefetched on window activation; re-verified since earlier actions may have moved it
+            prefetched = state["element_cache"].pop(field_name, None)
+            if prefetched:
+                template = self._load_template(field_name, field_type)
+                coords = self._verify_template_at(prefetched[0], template) if template is not None else None
+                if coords:
+                    state.update({
+                        "element_coords": coords,
+                        "element_handle": None,
+                        "element_found": True,
+                        "detection_method": prefetched[1]
+                    })
+                    self._remember_coords(cache_key, coords, prefetched[1])
+                    self._log_detection_success(prefetched[1], field_name, field_type, time.time() - start_time)
+                    return state
             
-            # Method 2: Win32 API
-            element_info = self._find_element_win32(window_handle, field_name, field_type)
-            if element_info:
+            # Method 0: coordinates from an earlier run, re-verified against the template
+            coords = self._find_element_cached(cache_key, field_name, field_type)
+            if coords:
                 state.update({
-                    "element_coords": element_info["coords"],
-                    "element_handle": element_info.get("handle"),
+                    "element_coords": coords,
+                    "element_handle": None,
                     "element_found": True,
-                    "detection_method": "Win32_API"
+                    "detection_method": "Coordinate_Cache"
                 })
-                self._capture_template(element_info["coords"], field_name, field_type)
-                self._log_detection_success("Win32_API", field_name, field_type, time.time() - start_time)
+                self._log_detection_success("Coordinate_Cache", field_name, field_type, time.time() - start_time)
                 return state
             
-            # Method 3: Template Matching
-            coords = self._find_element_template_matching(field_name, field_type)
-            if coords:
+            # Methods 1-3: UI Automation, Win32 API and Template Matching race; first hit wins
+            hit = self._race_detection(window_handle, field_name, field_type, step_data.get("automation_id"))
+            if hit:
+                method, coords, handle = hit
                 state.update({
                     "element_coords": coords,
-                    "element_handle": None,
+                    "element_handle": handle,
                     "element_found": True,
-                    "detection_method": "Template_Matching"
+                    "detection_method": method
                 })
-                self._log_detection_success("Template_Matching", field_name, field_type, time.time() - start_time)
+                if method != "Template_Matching":
+                    self._capture_template(coords, field_name, field_type)
+                self._remember_coords(cache_key, coords, method)
+                self._log_detection_success(method, field_name, field_type, time.time() - start_time)
                 return state
             
             # Method 4: OCR (Last Resort)
-            coords = self._find_element_ocr(field_name, state["ocr_reader"])
+            coords = self._find_element_ocr(
+                window_handle, field_name,
+                state["ocr_bbox_cache"], f"{step_data.get('window_name', '')}:{field_name}"
+            )
             if coords:
                 state.update({
                     "element_coords": coords,
@@ -297,6 +508,7 @@ class EnhancedDesktopAutomation:
                     "element_found": True,
                     "detection_method": "OCR"
                 })
+                self._remember_coords(cache_key, coords, "OCR")
                 self._log_detection_success("OCR", field_name, field_type, time.time() - start_time)
                 return state
             
@@ -327,7 +539,10 @@ class EnhancedDesktopAutomation:
             elif action_type == "typeInto":
                 pyautogui.click(element_coords[0], element_coords[1])
                 time.sleep(0.5)
-                pyautogui.typewrite(data)
+                if len(data) > PASTE_MIN_LENGTH:
+                    self._paste_text(data)
+                else:
+                    self._send_text_fast(data)
                 
             elif action_type == "keyPress":
                 if special_key:
@@ -350,6 +565,8 @@ class EnhancedDesktopAutomation:
     
     def complete_automation(self, state: AutomationState) -> AutomationState:
         """Complete the automation process"""
+        with self._gdi_lock:
+            self._release_gdi_surfaces()
         self.analytics_logger.info("Automation completed successfully!")
         return state
     
@@ -362,126 +579,212 @@ class EnhancedDesktopAutomation:
     # Helper methods for element detection
     
     def _find_window_by_name(self, window_name: str) -> Optional[int]:
-        """Find window handle by name (contains matching)"""
-        def enum_windows_proc(hwnd, lParam):
+        """Find window handle by name (contains matching, with title placeholders)
+        
+        Steps repeating a window_name reuse the hwnd it resolved to while that window
+        still matches. Otherwise the cached window index is searched; the windows are
+        enumerated again only when there is no match or the matched window has closed
+        or been retitled.
+        """
+        matches = _title_matcher(window_name)
+        hwnd = self._hwnd_by_name.get(window_name)
+        if hwnd and win32gui.IsWindow(hwnd) and win32gui.IsWindowVisible(hwnd) \
+                and matches(win32gui.GetWindowText(hwnd).lower()):
+            return hwnd
+        
+        for attempt in range(2):
+            if attempt:
+                self._rebuild_hwnd_index()
+            for title, hwnd in self._hwnd_index.items():
+                if matches(title):
+                    if win32gui.IsWindow(hwnd) and win32gui.IsWindowVisible(hwnd) \
+                            and win32gui.GetWindowText(hwnd).lower() == title:
+                        self._hwnd_by_name[window_name] = hwnd
+                        return hwnd
+                    break  # Stale entry; re-enumerate
+        return None
+    
+    def _rebuild_hwnd_index(self):
+        """Index visible top-level windows by lowercased title in one EnumWindows pass"""
+        def enum_windows_proc(hwnd, index):
             if win32gui.IsWindowVisible(hwnd):
                 window_text = win32gui.GetWindowText(hwnd)
-                if window_name.lower() in window_text.lower():
-                    lParam.append(hwnd)
+                if window_text:
+                    index.setdefault(window_text.lower(), hwnd)
             return True
         
-        windows = []
-        win32gui.EnumWindows(enum_windows_proc, windows)
-        return windows[0] if windows else None
+        index: Dict[str, int] = {}
+        win32gui.EnumWindows(enum_windows_proc, index)
+        self._hwnd_index = index
     
-    def _find_element_ui_automation(self, window_handle: int, field_name: str, field_type: str) -> Optional[Dict]:
-        """Find element using Windows UI Automation"""
+    @staticmethod
+    def _init_detect_worker():
+        pythoncom.CoInitializeEx(pythoncom.COINIT_APARTMENTTHREADED)
+    
+    def _race_detection(self, window_handle: int, field_name: str, field_type: str,
+                        automation_id: Optional[str] = None) -> Optional[Tuple[str, Tuple[int, int], Any]]:
+        """Run UIA, Win32 and template detection concurrently
+        
+        Returns (method, coords, handle) from the first method to find the element,
+        or None when all three miss or detection_timeout expires.
+        """
+        futures = {
+            self._detect_pool.submit(self._find_element_ui_automation, window_handle, field_name, field_type,
+                                     automation_id): "UI_Automation",
+            self._detect_pool.submit(self._find_element_win32, window_handle, field_name, field_type): "Win32_API",
+            self._detect_pool.submit(self._find_element_template_matching, window_handle, field_name, field_type): "Template_Matching",
+        }
+        try:
+            for future in as_completed(futures, timeout=self.detection_timeout):
+                result = future.result()
+                if not result:
+                    continue
+                if isinstance(result, dict):
+                    return futures[future], result["coords"], result.get("handle")
+                return futures[future], result, None
+        except FuturesTimeout:
+            pass
+        finally:
+            for future in futures:
+                future.cancel()
+        return None
+    
+    def _thread_uia(self) -> Tuple[Any, Dict[str, Any]]:
+        """UIA client and control type conditions for the calling thread, built once per thread"""
+        local = self._uia_local
+        if getattr(local, "client", None) is None:
+            local.client = Dispatch("UIAutomationCore.CUIAutomation")
+            # Offscreen elements cannot be clicked, so they are filtered out in the provider
+            # instead of having their names fetched across processes
+            onscreen = local.client.CreatePropertyCondition(UIA_IsOffscreenPropertyId, False)
+            local.conditions = {
+                field_type: local.client.CreateAndCondition(
+                    local.client.CreatePropertyCondition(UIA_ControlTypePropertyId, control_type), onscreen)
+                for field_type, control_type in FIELD_CONTROL_TYPES.items()
+            }
+        return local.client, local.conditions
+    
+    def _find_element_ui_automation(self, window_handle: int, field_name: str, field_type: str,
+                                    automation_id: Optional[str] = None) -> Optional[Dict]:
+        """Find element using Windows UI Automation
+        
+        A step's automation_id is locale-independent and tried before the name.
+        """
         try:
+            ui_automation, conditions = self._thread_uia()
+            
             # Get the automation element for the window
-            window_element = self.ui_automation.ElementFromHandle(window_handle)
+            window_element = ui_automation.ElementFromHandle(window_handle)
             if not window_element:
                 return None
             
-            # Define search conditions based on field_type
-            condition = None
-            if field_type == "push button":
-                condition = self.ui_automation.CreatePropertyCondition(
-                    30003,  # UIA_ControlTypePropertyId 
-                    50000   # UIA_ButtonControlTypeId
-                )
-            elif field_type == "editable text":
-                condition = self.ui_automation.CreatePropertyCondition(
-                    30003,  # UIA_ControlTypePropertyId
-                    50004   # UIA_EditControlTypeId
-                )
-            elif field_type == "link":
-                condition = self.ui_automation.CreatePropertyCondition(
-                    30003,  # UIA_ControlTypePropertyId
-                    50005   # UIA_HyperlinkControlTypeId
-                )
+            if automation_id:
+                by_id = window_element.FindFirst(TreeScope_Descendants, ui_automation.CreatePropertyCondition(
+                    UIA_AutomationIdPropertyId, automation_id))
+                element_info = self._element_info(by_id) if by_id else None
+                if element_info:
+                    return element_info
+            
+            # Search condition for the field_type
+            condition = conditions.get(field_type)
             
             # Search for elements
             if condition:
-                elements = window_element.FindAll(2, condition)  # TreeScope_Descendants
+                # Exact name: let UIA filter in the provider with a single FindFirst
+                exact = window_element.FindFirst(TreeScope_Descendants, ui_automation.CreateAndCondition(
+                    condition, ui_automation.CreatePropertyCondition(UIA_NamePropertyId, field_name)))
+                element_info = self._element_info(exact) if exact else None
+                if element_info:
+                    return element_info
+                
+                # Substring match (case-insensitive) needs the names client-side
+                field_name_lower = field_name.lower()
+                elements = window_element.FindAll(TreeScope_Children, condition)
                 for i in range(elements.Length):
                     element = elements.GetElement(i)
-                    element_name = element.GetCurrentPropertyValue(30005)  # UIA_NamePropertyId
+                    element_name = element.GetCurrentPropertyValue(UIA_NamePropertyId)
                     
-                    if element_name and field_name.lower() in element_name.lower():
-                        # Get element rectangle
-                        rect = element.GetCurrentPropertyValue(30001)  # UIA_BoundingRectanglePropertyId
-                        if rect:
-                            center_x = int(rect.left + rect.width / 2)
-                            center_y = int(rect.top + rect.height / 2)
-                            return {
-                                "coords": (center_x, center_y),
-                                "handle": element,
-                                "rect": rect
-                            }
+                    if element_name and field_name_lower in element_name.lower():
+                        element_info = self._element_info(element)
+                        if element_info:
+                            return element_info
             
             return None
             
         except Exception as e:
             return None
     
+    def _element_info(self, element) -> Optional[Dict]:
+        """Center, element and rectangle of a UIA element; None without a bounding rectangle"""
+        rect = element.GetCurrentPropertyValue(UIA_BoundingRectanglePropertyId)
+        if not rect:
+            return None
+        center_x = int(rect.left + rect.width / 2)
+        center_y = int(rect.top + rect.height / 2)
+        return {
+            "coords": (center_x, center_y),
+            "handle": element,
+            "rect": rect
+        }
+    
     def _find_element_win32(self, window_handle: int, field_name: str, field_type: str) -> Optional[Dict]:
         """Find element using Win32 API"""
         try:
+            field_name_lower = field_name.lower()
+            
             def enum_child_proc(hwnd, lParam):
                 window_text = win32gui.GetWindowText(hwnd)
-                class_name = win32gui.GetClassName(hwnd)
-                
-                # Check if text matches
-                if window_text and field_name.lower() in window_text.lower():
-                    # Get window rectangle
-                    rect = win32gui.GetWindowRect(hwnd)
-                    center_x = (rect[0] + rect[2]) // 2
-                    center_y = (rect[1] + rect[3]) // 2
-                    
-                    lParam.append({
-                        "coords": (center_x, center_y),
-                        "handle": hwnd,
-                        "text": window_text,
-                        "class": class_name
-                    })
-                
+                # Check if text matches; stop enumerating at the first hit
+                if window_text and field_name_lower in window_text.lower():
+                    raise _ChildFound(hwnd)
                 return True
             
-            elements = []
-            win32gui.EnumChildWindows(window_handle, enum_child_proc, elements)
+            try:
+                win32gui.EnumChildWindows(window_handle, enum_child_proc, None)
+                return None
+            except _ChildFound as found:
+                hwnd = found.hwnd
+            
+            # Rectangle and class only for the matched window
+            rect = win32gui.GetWindowRect(hwnd)
+            center_x = (rect[0] + rect[2]) // 2
+            center_y = (rect[1] + rect[3]) // 2
             
-            # Return first matching element
-            return elements[0] if elements else None
+            return {
+                "coords": (center_x, center_y),
+                "handle": hwnd,
+                "text": win32gui.GetWindowText(hwnd),
+                "class": win32gui.GetClassName(hwnd)
+            }
             
         except Exception as e:
             return None
     
-    def _find_element_template_matching(self, field_name: str, field_type: str) -> Optional[Tuple[int, int]]:
-        """Find element using OpenCV template matching"""
+    def _find_element_template_matching(self, window_handle: int, field_name: str, field_type: str) -> Optional[Tuple[int, int]]:
+        """Find element using OpenCV template matching within the window's rectangle"""
         try:
-            template_path = self._get_template_path(field_name, field_type)
-            if not template_path.exists():
+            template = self._load_template(field_name, field_type)
+            if template is None:
                 return None
             
-            # Take screenshot
-            screenshot = pyautogui.screenshot()
-            screenshot_np = np.array(screenshot)
-            screenshot_gray = cv2.cvtColor(screenshot_np, cv2.COLOR_RGB2GRAY)
+            # Take screenshot of the window region only
+            region = self._window_region(window_handle)
+            if not region:
+                return None
+            left, top = region[:2]
+            screenshot_gray = self._capture_gray(region)
             
-            # Load template
-            template = cv2.imread(str(template_path), 0)
-            if template is None:
+            template_h, template_w = template.shape
+            if screenshot_gray.shape[0] < template_h or screenshot_gray.shape[1] < template_w:
                 return None
             
             # Template matching
-            result = cv2.matchTemplate(screenshot_gray, template, cv2.TM_CCOEFF_NORMED)
-            _, max_val, _, max_loc = cv2.minMaxLoc(result)
+            min_val, min_loc = self._match_template(screenshot_gray, template)
             
             # Check confidence threshold
-            if max_val > 0.8:
-                template_h, template_w = template.shape
-                center_x = max_loc[0] + template_w // 2
-                center_y = max_loc[1] + template_h // 2
+            if min_val < TEMPLATE_MAX_SQDIFF:
+                center_x = left + min_loc[0] + template_w // 2
+                center_y = top + min_loc[1] + template_h // 2
                 return (center_x, center_y)
             
             return None
@@ -489,27 +792,124 @@ class EnhancedDesktopAutomation:
         except Exception as e:
             return None
     
-    def _find_element_ocr(self, field_name: str, ocr_reader) -> Optional[Tuple[int, int]]:
-        """Find element using OCR"""
+    def _match_template(self, image: np.ndarray, template: np.ndarray) -> Tuple[float, Tuple[int, int]]:
+        """Lowest normalized squared difference and its top-left location
+        
+        Searches at half resolution first, then refines at full resolution.
+        """
+        template_h, template_w = template.shape
+        if min(template_h, template_w) < 16:
+            # Too small to survive downsampling; search at full resolution
+            min_val, _, min_loc, _ = cv2.minMaxLoc(cv2.matchTemplate(image, template, cv2.TM_SQDIFF_NORMED))
+            return min_val, min_loc
+        
+        coarse = cv2.matchTemplate(cv2.pyrDown(image), cv2.pyrDown(template), cv2.TM_SQDIFF_NORMED)
+        _, _, (coarse_x, coarse_y), _ = cv2.minMaxLoc(coarse)
+        
+        # Re-match at full resolution in a small neighbourhood of the coarse hit
+        pad = 2
+        x0, y0 = max(coarse_x * 2 - pad, 0), max(coarse_y * 2 - pad, 0)
+        x1 = min(coarse_x * 2 + template_w + pad, image.shape[1])
+        y1 = min(coarse_y * 2 + template_h + pad, image.shape[0])
+        min_val, _, (fine_x, fine_y), _ = cv2.minMaxLoc(
+            cv2.matchTemplate(image[y0:y1, x0:x1], template, cv2.TM_SQDIFF_NORMED))
+        return min_val, (x0 + fine_x, y0 + fine_y)
+    
+    def _find_element_ocr(self, window_handle: int, field_name: str,
+                          bbox_cache: Optional[Dict[str, List[int]]] = None,
+                          cache_key: str = "") -> Optional[Tuple[int, int]]:
+        """Find element using OCR within the window's rectangle
+        
+        bbox_cache maps cache_key to the window-relative [x_min, x_max, y_min, y_max]
+        of an earlier match; when present only that box is recognized, skipping detection.
+        """
         try:
-            screenshot = pyautogui.screenshot()
+            region = self._window_region(window_handle)
+            if not region:
+                return None
+            left, top = region[:2]
+            screenshot = pyautogui.screenshot(region=region)
             screenshot_np = np.array(screenshot)
+            ocr_reader = self.ocr_reader_lazy
+            
+            cached_box = bbox_cache.get(cache_key) if bbox_cache is not None else None
+            if cached_box:
+                results = ocr_reader.recognize(screenshot_np, horizontal_list=[cached_box], free_list=[])
+                if any(confidence > 0.5 and field_name.lower() in detected_text.lower()
+                       for (_, detected_text, confidence) in results):
+                    x_min, x_max, y_min, y_max = cached_box
+                    return (left + (x_min + x_max) // 2, top + (y_min + y_max) // 2)
             
-            results = ocr_reader.readtext(screenshot_np)
+            # UI text is small and clean; no need for the scene-text canvas and magnification
+            results = ocr_reader.readtext(screenshot_np, canvas_size=1280, mag_ratio=1.0)
+            if not results:
+                return None
             
-            for (bbox, detected_text, confidence) in results:
-                if confidence > 0.5 and field_name.lower() in detected_text.lower():
-                    x_coords = [point[0] for point in bbox]
-                    y_coords = [point[1] for point in bbox]
-                    center_x = int(sum(x_coords) / len(x_coords))
-                    center_y = int(sum(y_coords) / len(y_coords))
-                    return (center_x, center_y)
+            # Filter and locate all boxes at once: (N, 4, 2) corners, lowercased texts
+            bboxes = np.asarray([r[0] for r in results], dtype=np.float32)
+            texts = np.array([r[1].lower() for r in results])
+            confidences = np.asarray([r[2] for r in results], dtype=np.float32)
+            hits = np.flatnonzero((confidences > 0.5) & (np.char.find(texts, field_name.lower()) >= 0))
+            if not hits.size:
+                return None
             
-            return None
+            bbox = bboxes[hits[0]]
+            if bbox_cache is not None:
+                x_min, y_min = bbox.min(axis=0).astype(int).tolist()
+                x_max, y_max = bbox.max(axis=0).astype(int).tolist()
+                bbox_cache[cache_key] = [x_min, x_max, y_min, y_max]
+            center_x, center_y = bbox.mean(axis=0).astype(np.int32).tolist()
+            return (left + center_x, top + center_y)
             
         except Exception as e:
             return None
     
+    def _capture_gray(self, region: Tuple[int, int, int, int]) -> np.ndarray:
+        """Grayscale capture of a (left, top, width, height) screen region
+        
+        BitBlts straight into a GDI bitmap kept per region size and converts its
+        BGRA bits in one pass, skipping the PIL image and RGB copy.
+        """
+        left, top, width, height = region
+        with self._gdi_lock:
+            surface = self._gdi_surfaces.get((width, height))
+            if surface is None:
+                if len(self._gdi_surfaces) >= 4:
+                    self._release_gdi_surfaces()
+                desktop = win32gui.GetDesktopWindow()
+                window_dc = win32gui.GetWindowDC(desktop)
+                source_dc = win32ui.CreateDCFromHandle(window_dc)
+                memory_dc = source_dc.CreateCompatibleDC()
+                bitmap = win32ui.CreateBitmap()
+                bitmap.CreateCompatibleBitmap(source_dc, width, height)
+                memory_dc.SelectObject(bitmap)
+                surface = (desktop, window_dc, source_dc, memory_dc, bitmap)
+                self._gdi_surfaces[(width, height)] = surface
+            
+            _, _, source_dc, memory_dc, bitmap = surface
+            memory_dc.BitBlt((0, 0), (width, height), source_dc, (left, top), win32con.SRCCOPY)
+            bgra = np.frombuffer(bitmap.GetBitmapBits(True), dtype=np.uint8).reshape(height, width, 4)
+        return cv2.cvtColor(bgra, cv2.COLOR_BGRA2GRAY)
+    
+    def _release_gdi_surfaces(self):
+        for desktop, window_dc, source_dc, memory_dc, bitmap in self._gdi_surfaces.values():
+            try:
+                memory_dc.DeleteDC()
+                win32gui.DeleteObject(bitmap.GetHandle())
+                source_dc.DeleteDC()
+                win32gui.ReleaseDC(desktop, window_dc)
+            except Exception:
+                pass
+        self._gdi_surfaces.clear()
+    
+    def _window_region(self, window_handle: int) -> Optional[Tuple[int, int, int, int]]:
+        """Window rectangle as an on-screen (left, top, width, height) capture region"""
+        left, top, right, bottom = win32gui.GetWindowRect(window_handle)
+        left, top = max(left, 0), max(top, 0)
+        if right <= left or bottom <= top:
+            return None
+        return (left, top, right - left, bottom - top)
+    
     def _capture_template(self, coords: Tuple[int, int], field_name: str, field_type: str):
         """Capture template image for future use"""
         try:
@@ -523,7 +923,7 @@ class EnhancedDesktopAutomation:
             
             # Capture screenshot around the element
             x, y = coords
-            margin = 20
+            margin = TEMPLATE_MARGIN
             
             screenshot = pyautogui.screenshot(region=(
                 max(0, x - margin),
@@ -533,53 +933,173 @@ class EnhancedDesktopAutomation:
             ))
             
             screenshot.save(template_path)
+            self._template_cache[template_path.stem] = cv2.cvtColor(np.array(screenshot), cv2.COLOR_RGB2GRAY)
             self.analytics_logger.info(f"Template captured: {template_path}")
             
         except Exception as e:
             self.analytics_logger.warning(f"Failed to capture template: {str(e)}")
     
+    # Persistent coordinate cache
+    
+    def _coord_cache_key(self, window_name: str, field_name: str, field_type: str) -> str:
+        return hashlib.md5(f"{window_name}|{field_name}|{field_type}".encode()).hexdigest()
+    
+    def _load_coord_cache(self) -> Dict[str, Dict[str, Any]]:
+        try:
+            with open(self.coord_cache_path, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+    
+    def _remember_coords(self, cache_key: str, coords: Tuple[int, int], method: str):
+        """Record a detection and write the cache file atomically"""
+        self._coord_cache[cache_key] = {"coords": [int(coords[0]), int(coords[1])], "method": method}
+        try:
+            tmp_path = self.coord_cache_path.with_suffix(".tmp")
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(self._coord_cache, f)
+            os.replace(tmp_path, self.coord_cache_path)
+        except OSError as e:
+            self.analytics_logger.warning(f"Failed to save coordinate cache: {str(e)}")
+    
+    def _find_element_cached(self, cache_key: str, field_name: str, field_type: str) -> Optional[Tuple[int, int]]:
+        """Return cached coordinates if the element's template is still on screen there"""
+        entry = self._coord_cache.get(cache_key)
+        if not entry:
+            return None
+        
+        template = self._load_template(field_name, field_type)
+        if template is None:
+            return None
+        return self._verify_template_at(tuple(entry["coords"]), template)
+    
+    def _verify_template_at(self, coords: Tuple[int, int], template: np.ndarray) -> Optional[Tuple[int, int]]:
+        """Re-locate the template in a small region around coords; None if it is not there"""
+        try:
+            x, y = coords
+            reach = TEMPLATE_MARGIN + CACHE_VERIFY_SLACK
+            left, top = max(0, x - reach), max(0, y - reach)
+            screenshot_gray = self._capture_gray((left, top, reach * 2, reach * 2))
+            if screenshot_gray.shape[0] < template.shape[0] or screenshot_gray.shape[1] < template.shape[1]:
+                return None
+            
+            min_val, _, min_loc, _ = cv2.minMaxLoc(cv2.matchTemplate(screenshot_gray, template, cv2.TM_SQDIFF_NORMED))
+            if min_val < TEMPLATE_MAX_SQDIFF:
+                return (left + min_loc[0] + template.shape[1] // 2, top + min_loc[1] + template.shape[0] // 2)
+            return None
+            
+        except Exception:
+            return None
+    
+    def _load_template(self, field_name: str, field_type: str) -> Optional[np.ndarray]:
+        """Grayscale template for the element, or None if none was captured"""
+        template_path = self._get_template_path(field_name, field_type)
+        template = self._template_cache.get(template_path.stem)
+        if template is None and template_path.exists():
+            template = cv2.imread(str(template_path), 0)
+            if template is not None:
+                self._template_cache[template_path.stem] = template
+        return template
+    
+    def _prefetch_window_elements(self, window_handle: int, state: AutomationState):
+        """Locate the templates of the upcoming steps in this window from one screenshot"""
+        steps = state["steps"]
+        window_name = state["current_step_data"].get("window_name", "")
+        
+        templates = []
+        for step in steps[state["current_step"]:]:
+            if step.get("window_name", "") != window_name:
+                break
+            template = self._load_template(step["field_name"], step["field_type"])
+            if template is not None:
+                templates.append((step["field_name"], template))
+        if not templates:
+            return
+        
+        region = self._window_region(window_handle)
+        if not region:
+            return
+        left, top = region[:2]
+        screenshot_gray = self._capture_gray(region)
+        
+        for field_name, template in templates:
+            template_h, template_w = template.shape
+            if screenshot_gray.shape[0] < template_h or screenshot_gray.shape[1] < template_w:
+                continue
+            min_val, min_loc = self._match_template(screenshot_gray, template)
+            if min_val < TEMPLATE_MAX_SQDIFF:
+                coords = (left + min_loc[0] + template_w // 2, top + min_loc[1] + template_h // 2)
+                state["element_cache"][field_name] = (coords, "Template_Matching")
+    
     def _get_template_path(self, field_name: str, field_type: str) -> Path:
         """Generate template file path"""
-        field_hash = hashlib.md5(field_name.encode()).hexdigest()[:8]
-        filename = f"{field_type}_{field_hash}.png"
-        return self.templates_dir / filename
+        template_path = self._template_paths.get((field_name, field_type))
+        if template_path is None:
+            # md5 keeps the names of templates captured by earlier runs
+            field_hash = hashlib.md5(field_name.encode()).hexdigest()[:8]
+            template_path = self.templates_dir / f"{field_type}_{field_hash}.png"
+            self._template_paths[(field_name, field_type)] = template_path
+        return template_path
+    
+    def _send_text_fast(self, text: str):
+        """Type text with a single SendInput call, one Unicode key down/up pair per UTF-16 unit"""
+        encoded = text.encode("utf-16-le")
+        units = [int.from_bytes(encoded[i:i + 2], "little") for i in range(0, len(encoded), 2)]
+        if not units:
+            return
+        
+        inputs = (INPUT * (len(units) * 2))()
+        for i, unit in enumerate(units):
+            for slot, flags in ((inputs[2 * i], KEYEVENTF_UNICODE),
+                                (inputs[2 * i + 1], KEYEVENTF_UNICODE | KEYEVENTF_KEYUP)):
+                slot.type = INPUT_KEYBOARD
+                slot.union.ki.wScan = unit
+                slot.union.ki.dwFlags = flags
+        
+        sent = ctypes.windll.user32.SendInput(len(inputs), inputs, ctypes.sizeof(INPUT))
+        if sent != len(inputs):
+            raise ctypes.WinError()
+    
+    def _paste_text(self, text: str):
+        """Paste text with Ctrl+V, putting back any text that was on the clipboard
+        
+        Falls back to typing when the clipboard cannot be opened.
+        """
+        try:
+            win32clipboard.OpenClipboard()
+        except Exception:
+            self._send_text_fast(text)
+            return
+        try:
+            previous = None
+            if win32clipboard.IsClipboardFormatAvailable(win32con.CF_UNICODETEXT):
+                previous = win32clipboard.GetClipboardData(win32con.CF_UNICODETEXT)
+            win32clipboard.EmptyClipboard()
+            win32clipboard.SetClipboardText(text, win32con.CF_UNICODETEXT)
+        finally:
+            win32clipboard.CloseClipboard()
+        
+        pyautogui.hotkey('ctrl', 'v')
+        
+        if previous is not None:
+            time.sleep(CLIPBOARD_RESTORE_DELAY)
+            try:
+                win32clipboard.OpenClipboard()
+                try:
+                    win32clipboard.EmptyClipboard()
+                    win32clipboard.SetClipboardText(previous, win32con.CF_UNICODETEXT)
+                finally:
+                    win32clipboard.CloseClipboard()
+            except Exception:
+                pass
     
     def _send_special_key(self, special_key: str):
         """Send special key combinations"""
-        key_map = {
-            "Enter": "enter",
-            "Tab": "tab",
-            "Escape": "esc",
-            "Space": "space",
-            "Backspace": "backspace",
-            "Delete": "del",
-            "Home": "home",
-            "End": "end",
-            "PageUp": "pageup",
-            "PageDown": "pagedown",
-            "Up": "up",
-            "Down": "down",
-            "Left": "left",
-            "Right": "right"
-        }
-        
-        # Handle function keys
-        for i in range(1, 13):
-            key_map[f"F{i}"] = f"f{i}"
-        
-        # Handle Ctrl combinations
-        if special_key.startswith("Ctrl+"):
-            key = special_key.split("+")[1].lower()
-            pyautogui.hotkey('ctrl', key)
-        elif special_key.startswith("Alt+"):
-            key = special_key.split("+")[1].lower()
-            pyautogui.hotkey('alt', key)
-        elif special_key.startswith("Shift+"):
-            key = special_key.split("+")[1].lower()
-            pyautogui.hotkey('shift', key)
+        keys = _parse_hotkey(special_key)
+        if len(keys) > 1:
+            pyautogui.hotkey(*keys)
         else:
-            key = key_map.get(special_key, special_key.lower())
-            pyautogui.press(key)
+            pyautogui.press(keys[0])
     
     def _log_detection_success(self, method: str, field_name: str, field_type: str, duration: float):
         """Log successful element detection"""
@@ -613,6 +1133,10 @@ class EnhancedDesktopAutomation:
     
     def run_automation(self, exe_path: str, steps_json: List[Dict[str, Any]]) -> None:
         """Run the automation process"""
+        # Window activation is handled automatically before each step, so explicit
+        # windowActivate steps are dropped up front; current_step indexes this list
+        steps_json = [s for s in steps_json if s.get("event_action_type") != "windowActivate"]
+        
         initial_state = AutomationState(
             exe_path=exe_path,
             steps=steps_json,
@@ -624,6 +1148,7 @@ class EnhancedDesktopAutomation:
             ocr_reader=None,
             ui_automation=None,
             element_cache={},
+            ocr_bbox_cache={},
             current_window_handle=None,
             templates_dir="",
             analytics_logger=None,
@@ -639,4 +1164,8 @@ class EnhancedDesktopAutomation:
             
         except Exception as e:
             self.analytics_logger.error(f"Automation failed: {str(e)}")
-            raise
\ No newline at end of file
+            raise
+        
+        finally:
+            with self._gdi_lock:
+                self._release_gdi_surfaces()
\ No newline at end of file
@@ -3,247 +3,310 @@ Enhanced Desktop Automation Tool Examples
 Demonstrates the new window-scoped automation with improved detection methods
 """
 
+import shutil
+import sys
+from types import MappingProxyType
+
 from enhanced_desktop_automation import EnhancedDesktopAutomation
 
 
+# Keys every step dictionary must carry
+REQUIRED_STEP_KEYS = ("window_name", "field_name", "field_type", "event_action_type")
+SUPPORTED_ACTIONS = {"click", "typeInto", "keyPress", "windowActivate"}
+
+# Shared by all examples so chained runs reuse one logger, COM client and caches
+_TOOL = None
+# exe_path as given -> absolute path found on PATH
+_EXE_PATHS = {}
+
+
+def _tool():
+    """The shared automation tool, created on first use"""
+    global _TOOL
+    if _TOOL is None:
+        _TOOL = EnhancedDesktopAutomation()
+    return _TOOL
+
+
+def _resolve_exe(exe_path):
+    """Absolute path of exe_path, searched on PATH once per name"""
+    resolved = _EXE_PATHS.get(exe_path)
+    if resolved is None:
+        resolved = _EXE_PATHS[exe_path] = shutil.which(exe_path) or exe_path
+    return resolved
+
+
+def _frozen_steps(steps):
+    """Read-only view of a step list, built once and shared by every run"""
+    return tuple(MappingProxyType(step) for step in steps)
+
+
+EDGE_STEPS = _frozen_steps([
+    {
+        "window_name": "Wells Fargo Technology  [ORGANIZATION]? Edge",
+        "field_name": "Wells Fargo Technology - Work - Microsoft? Edge",
+        "field_type": "client",
+        "event_action_type": "windowActivate",
+        "SpecialKeyWithData": "",
+        "Data": ""
+    },
+    {
+        "window_name": "Wells Fargo Technology  [ORGANIZATION]? Edge",
+        "field_name": "Address and search bar",
+        "field_type": "editable text",
+        "event_action_type": "click",
+        "SpecialKeyWithData": "",
+        "Data": ""
+    },
+    {
+        "window_name": "Wells Fargo Technology  [ORGANIZATION]? Edge",
+        "field_name": "Address and search bar",
+        "field_type": "editable text",
+        "event_action_type": "typeInto",
+        "SpecialKeyWithData": "",
+        "Data": "www.wellsfargo.com"
+    },
+    {
+        "window_name": "Wells Fargo Technology  [ORGANIZATION]? Edge",
+        "field_name": "Wells Fargo Technology - Work - Microsoft? Edge",
+        "field_type": "client",
+        "event_action_type": "windowActivate",
+        "SpecialKeyWithData": "",
+        "Data": "Enter"
+    },
+    {
+        "window_name": "Wells Fargo Technology  [ORGANIZATION]? Edge",
+        "field_name": "Address and search bar",
+        "field_type": "editable text",
+        "event_action_type": "keyPress",
+        "SpecialKeyWithData": "Enter",
+        "Data": "Enter"
+    }
+])
+
+
 def example_wells_fargo_edge_automation():
     """Example: Wells Fargo automation in Microsoft Edge"""
     
-    steps = [
-        {
-            "window_name": "Wells Fargo Technology  [ORGANIZATION]? Edge",
-            "field_name": "Wells Fargo Technology - Work - Microsoft? Edge",
-            "field_type": "client",
-            "event_action_type": "windowActivate",
-            "SpecialKeyWithData": "",
-            "Data": ""
-        },
-        {
-            "window_name": "Wells Fargo Technology  [ORGANIZATION]? Edge",
-            "field_name": "Address and search bar",
-            "field_type": "editable text",
-            "event_action_type": "click",
-            "SpecialKeyWithData": "",
-            "Data": ""
-        },
-        {
-            "window_name": "Wells Fargo Technology  [ORGANIZATION]? Edge",
-            "field_name": "Address and search bar",
-            "field_type": "editable text",
-            "event_action_type": "typeInto",
-            "SpecialKeyWithData": "",
-            "Data": "www.wellsfargo.com"
-        },
-        {
-            "window_name": "Wells Fargo Technology  [ORGANIZATION]? Edge",
-            "field_name": "Wells Fargo Technology - Work - Microsoft? Edge",
-            "field_type": "client",
-            "event_action_type": "windowActivate",
-            "SpecialKeyWithData": "",
-            "Data": "Enter"
-        },
-        {
-            "window_name": "Wells Fargo Technology  [ORGANIZATION]? Edge",
-            "field_name": "Address and search bar",
-            "field_type": "editable text",
-            "event_action_type": "keyPress",
-            "SpecialKeyWithData": "Enter",
-            "Data": "Enter"
-        }
-    ]
-    
-    automation_tool = EnhancedDesktopAutomation()
+    automation_tool = _tool()
     exe_path = "C:\\Program Files (x86)\\Microsoft\\Edge\\Application\\msedge.exe"
     
     try:
         print("Starting Wells Fargo Edge automation...")
-        automation_tool.run_automation(exe_path, steps)
+        automation_tool.run_automation(_resolve_exe(exe_path), EDGE_STEPS)
         print("Automation completed successfully!")
+        return True
         
     except Exception as e:
         print(f"Automation failed: {str(e)}")
+        return False
+
+
+CALCULATOR_STEPS = _frozen_steps([
+    {
+        "window_name": "Calculator",
+        "field_name": "Calculator",
+        "field_type": "client",
+        "event_action_type": "windowActivate",
+        "SpecialKeyWithData": "",
+        "Data": ""
+    },
+    {
+        "window_name": "Calculator",
+        "field_name": "Five",
+        "automation_id": "num5Button",
+        "field_type": "push button",
+        "event_action_type": "click",
+        "SpecialKeyWithData": "",
+        "Data": ""
+    },
+    {
+        "window_name": "Calculator",
+        "field_name": "Plus",
+        "automation_id": "plusButton",
+        "field_type": "push button",
+        "event_action_type": "click",
+        "SpecialKeyWithData": "",
+        "Data": ""
+    },
+    {
+        "window_name": "Calculator",
+        "field_name": "Three",
+        "automation_id": "num3Button",
+        "field_type": "push button",
+        "event_action_type": "click",
+        "SpecialKeyWithData": "",
+        "Data": ""
+    },
+    {
+        "window_name": "Calculator",
+        "field_name": "Calculator",
+        "field_type": "client",
+        "event_action_type": "keyPress",
+        "SpecialKeyWithData": "Enter",
+        "Data": ""
+    }
+])
 
 
 def example_calculator_automation():
     """Example: Windows Calculator automation with special keys"""
     
-    steps = [
-        {
-            "window_name": "Calculator",
-            "field_name": "Calculator",
-            "field_type": "client",
-            "event_action_type": "windowActivate",
-            "SpecialKeyWithData": "",
-            "Data": ""
-        },
-        {
-            "window_name": "Calculator",
-            "field_name": "Five",
-            "field_type": "push button",
-            "event_action_type": "click",
-            "SpecialKeyWithData": "",
-            "Data": ""
-        },
-        {
-            "window_name": "Calculator",
-            "field_name": "Plus",
-            "field_type": "push button",
-            "event_action_type": "click",
-            "SpecialKeyWithData": "",
-            "Data": ""
-        },
-        {
-            "window_name": "Calculator",
-            "field_name": "Three",
-            "field_type": "push button",
-            "event_action_type": "click",
-            "SpecialKeyWithData": "",
-            "Data": ""
-        },
-        {
-            "window_name": "Calculator",
-            "field_name": "Calculator",
-            "field_type": "client",
-            "event_action_type": "keyPress",
-            "SpecialKeyWithData": "Enter",
-            "Data": ""
-        }
-    ]
-    
-    automation_tool = EnhancedDesktopAutomation()
+    automation_tool = _tool()
     exe_path = "calc.exe"
     
     try:
         print("Starting Calculator automation...")
-        automation_tool.run_automation(exe_path, steps)
+        automation_tool.run_automation(_resolve_exe(exe_path), CALCULATOR_STEPS)
         print("Automation completed successfully!")
+        return True
         
     except Exception as e:
         print(f"Automation failed: {str(e)}")
+        return False
+
+
+NOTEPAD_STEPS = _frozen_steps([
+    {
+        "window_name": "Untitled - Notepad",
+        "field_name": "Text Editor",
+        "field_type": "editable text",
+        "event_action_type": "click",
+        "SpecialKeyWithData": "",
+        "Data": ""
+    },
+    {
+        "window_name": "Untitled - Notepad",
+        "field_name": "Text Editor",
+        "field_type": "editable text",
+        "event_action_type": "typeInto",
+        "SpecialKeyWithData": "",
+        "Data": "Hello World! This is automated text."
+    },
+    {
+        "window_name": "Untitled - Notepad",
+        "field_name": "Text Editor",
+        "field_type": "editable text",
+        "event_action_type": "keyPress",
+        "SpecialKeyWithData": "Ctrl+a",
+        "Data": ""
+    },
+    {
+        "window_name": "Untitled - Notepad",
+        "field_name": "Text Editor",
+        "field_type": "editable text",
+        "event_action_type": "keyPress",
+        "SpecialKeyWithData": "Ctrl+c",
+        "Data": ""
+    },
+    {
+        "window_name": "Untitled - Notepad",
+        "field_name": "Text Editor",
+        "field_type": "editable text",
+        "event_action_type": "keyPress",
+        "SpecialKeyWithData": "End",
+        "Data": ""
+    },
+    {
+        "window_name": "Untitled - Notepad",
+        "field_name": "Text Editor",
+        "field_type": "editable text",
+        "event_action_type": "keyPress",
+        "SpecialKeyWithData": "Enter",
+        "Data": ""
+    },
+    {
+        "window_name": "Untitled - Notepad",
+        "field_name": "Text Editor",
+        "field_type": "editable text",
+        "event_action_type": "keyPress",
+        "SpecialKeyWithData": "Ctrl+v",
+        "Data": ""
+    }
+])
 
 
 def example_notepad_with_special_keys():
     """Example: Notepad automation with various key combinations"""
     
-    steps = [
-        {
-            "window_name": "Untitled - Notepad",
-            "field_name": "Text Editor",
-            "field_type": "editable text",
-            "event_action_type": "click",
-            "SpecialKeyWithData": "",
-            "Data": ""
-        },
-        {
-            "window_name": "Untitled - Notepad",
-            "field_name": "Text Editor",
-            "field_type": "editable text",
-            "event_action_type": "typeInto",
-            "SpecialKeyWithData": "",
-            "Data": "Hello World! This is automated text."
-        },
-        {
-            "window_name": "Untitled - Notepad",
-            "field_name": "Text Editor",
-            "field_type": "editable text",
-            "event_action_type": "keyPress",
-            "SpecialKeyWithData": "Ctrl+a",
-            "Data": ""
-        },
-        {
-            "window_name": "Untitled - Notepad",
-            "field_name": "Text Editor",
-            "field_type": "editable text",
-            "event_action_type": "keyPress",
-            "SpecialKeyWithData": "Ctrl+c",
-            "Data": ""
-        },
-        {
-            "window_name": "Untitled - Notepad",
-            "field_name": "Text Editor",
-            "field_type": "editable text",
-            "event_action_type": "keyPress",
-            "SpecialKeyWithData": "End",
-            "Data": ""
-        },
-        {
-            "window_name": "Untitled - Notepad",
-            "field_name": "Text Editor",
-            "field_type": "editable text",
-            "event_action_type": "keyPress",
-            "SpecialKeyWithData": "Enter",
-            "Data": ""
-        },
-        {
-            "window_name": "Untitled - Notepad",
-            "field_name": "Text Editor",
-            "field_type": "editable text",
-            "event_action_type": "keyPress",
-            "SpecialKeyWithData": "Ctrl+v",
-            "Data": ""
-        }
-    ]
-    
-    automation_tool = EnhancedDesktopAutomation()
+    automation_tool = _tool()
     exe_path = "C:\\Windows\\System32\\notepad.exe"
     
     try:
         print("Starting Notepad automation with special keys...")
-        automation_tool.run_automation(exe_path, steps)
+        automation_tool.run_automation(_resolve_exe(exe_path), NOTEPAD_STEPS)
         print("Automation completed successfully!")
+        return True
         
     except Exception as e:
         print(f"Automation failed: {str(e)}")
+        return False
+
+
+FILE_EXPLORER_STEPS = _frozen_steps([
+    {
+        "window_name": "File Explorer",
+        "field_name": "File Explorer",
+        "field_type": "client",
+        "event_action_type": "windowActivate",
+        "SpecialKeyWithData": "",
+        "Data": ""
+    },
+    {
+        "window_name": "File Explorer",
+        "field_name": "Address bar",
+        "field_type": "editable text",
+        "event_action_type": "keyPress",
+        "SpecialKeyWithData": "Ctrl+l",
+        "Data": ""
+    },
+    {
+        "window_name": "File Explorer",
+        "field_name": "Address bar",
+        "field_type": "editable text",
+        "event_action_type": "typeInto",
+        "SpecialKeyWithData": "",
+        "Data": "C:\\Users\\Public\\Documents"
+    },
+    {
+        "window_name": "File Explorer",
+        "field_name": "Address bar",
+        "field_type": "editable text",
+        "event_action_type": "keyPress",
+        "SpecialKeyWithData": "Enter",
+        "Data": ""
+    }
+])
 
 
 def example_file_explorer_automation():
     """Example: File Explorer navigation"""
     
-    steps = [
-        {
-            "window_name": "File Explorer",
-            "field_name": "File Explorer",
-            "field_type": "client",
-            "event_action_type": "windowActivate",
-            "SpecialKeyWithData": "",
-            "Data": ""
-        },
-        {
-            "window_name": "File Explorer",
-            "field_name": "Address bar",
-            "field_type": "editable text",
-            "event_action_type": "keyPress",
-            "SpecialKeyWithData": "Ctrl+l",
-            "Data": ""
-        },
-        {
-            "window_name": "File Explorer",
-            "field_name": "Address bar",
-            "field_type": "editable text",
-            "event_action_type": "typeInto",
-            "SpecialKeyWithData": "",
-            "Data": "C:\\Users\\Public\\Documents"
-        },
-        {
-            "window_name": "File Explorer",
-            "field_name": "Address bar",
-            "field_type": "editable text",
-            "event_action_type": "keyPress",
-            "SpecialKeyWithData": "Enter",
-            "Data": ""
-        }
-    ]
-    
-    automation_tool = EnhancedDesktopAutomation()
+    automation_tool = _tool()
     exe_path = "explorer.exe"
     
     try:
         print("Starting File Explorer automation...")
-        automation_tool.run_automation(exe_path, steps)
+        automation_tool.run_automation(_resolve_exe(exe_path), FILE_EXPLORER_STEPS)
         print("Automation completed successfully!")
+        return True
         
     except Exception as e:
         print(f"Automation failed: {str(e)}")
+        return False
+
+
+def validate_steps(steps):
+    """Return a list of problems found in the steps; empty when they are all usable"""
+    
+    problems = []
+    for index, step in enumerate(steps, 1):
+        missing = [key for key in REQUIRED_STEP_KEYS if not step.get(key)]
+        if missing:
+            problems.append(f"Step {index}: missing {', '.join(missing)}")
+        elif step["event_action_type"] not in SUPPORTED_ACTIONS:
+            problems.append(f"Step {index}: unsupported action '{step['event_action_type']}'")
+    return problems
 
 
 def run_automation_from_dict(automation_config):
@@ -254,16 +317,26 @@ def run_automation_from_dict(automation_config):
     
     if not exe_path or not steps:
         print("Invalid configuration. Must contain 'exe_path' and 'steps'.")
-        return
+        return False
+    
+    # Check every step once, before the application is launched
+    problems = validate_steps(steps)
+    if problems:
+        print("Invalid configuration:")
+        for problem in problems:
+            print(f"- {problem}")
+        return False
     
     try:
-        automation_tool = EnhancedDesktopAutomation()
+        automation_tool = _tool()
         print(f"Starting automation for: {exe_path}")
-        automation_tool.run_automation(exe_path, steps)
+        automation_tool.run_automation(_resolve_exe(exe_path), steps)
         print("Automation completed successfully!")
+        return True
         
     except Exception as e:
         print(f"Automation failed: {str(e)}")
+        return False
 
 
 def example_custom_configuration():
@@ -284,6 +357,7 @@ def example_custom_configuration():
             {
                 "window_name": "Calculator",
                 "field_name": "Two",
+                "automation_id": "num2Button",
                 "field_type": "push button",
                 "event_action_type": "click",
                 "SpecialKeyWithData": "",
@@ -292,6 +366,7 @@ def example_custom_configuration():
             {
                 "window_name": "Calculator",
                 "field_name": "Multiply by",
+                "automation_id": "multiplyButton",
                 "field_type": "push button",
                 "event_action_type": "click",
                 "SpecialKeyWithData": "",
@@ -300,6 +375,7 @@ def example_custom_configuration():
             {
                 "window_name": "Calculator",
                 "field_name": "Six",
+                "automation_id": "num6Button",
                 "field_type": "push button",
                 "event_action_type": "click",
                 "SpecialKeyWithData": "",
@@ -317,7 +393,7 @@ def example_custom_configuration():
     }
     
     print("Starting custom configuration automation...")
-    run_automation_from_dict(config)
+    return run_automation_from_dict(config)
 
 
 def example_analytics_demonstration():
@@ -326,23 +402,15 @@ def example_analytics_demonstration():
     print("Running multiple automations to demonstrate analytics...")
     print("Check the 'logs/automation_analytics.log' file for detailed metrics.")
     
-    # Run Calculator example
-    try:
-        example_calculator_automation()
-    except:
-        pass
-    
-    # Small delay between examples
-    import time
-    time.sleep(2)
-    
-    # Run Notepad example
-    try:
-        example_notepad_with_special_keys()
-    except:
-        pass
+    # Each example reports its own failure and returns whether it succeeded
+    results = {
+        "Calculator": example_calculator_automation(),
+        "Notepad": example_notepad_with_special_keys(),
+    }
     
     print("\nAnalytics logging demonstration completed!")
+    for name, ok in results.items():
+        print(f"{name}: {'succeeded' if ok else 'failed'}")
     print("Review logs/automation_analytics.log to see:")
     print("- Detection methods used")
     print("- Success/failure rates")
@@ -350,31 +418,32 @@ def example_analytics_demonstration():
     print("- Element types and names")
 
 
+# Menu choice -> (description, example)
+EXAMPLES = {
+    "1": ("Wells Fargo Edge automation", example_wells_fargo_edge_automation),
+    "2": ("Calculator automation", example_calculator_automation),
+    "3": ("Notepad with special keys", example_notepad_with_special_keys),
+    "4": ("File Explorer navigation", example_file_explorer_automation),
+    "5": ("Custom configuration example", example_custom_configuration),
+    "6": ("Analytics demonstration", example_analytics_demonstration),
+}
+
+
 if __name__ == "__main__":
     print("Enhanced Desktop Automation Tool - Examples")
     print("=" * 50)
     
     print("Available examples:")
-    print("1. Wells Fargo Edge automation")
-    print("2. Calculator automation")
-    print("3. Notepad with special keys")
-    print("4. File Explorer navigation")
-    print("5. Custom configuration example")
-    print("6. Analytics demonstration")
+    for key, (description, _) in EXAMPLES.items():
+        print(f"{key}. {description}")
     
-    choice = input("Enter your choice (1-6): ").strip()
+    # A choice on the command line (python samples_enhanced.py 2) skips the prompt
+    if len(sys.argv) > 1:
+        choice = sys.argv[1].strip()
+    else:
+        choice = input(f"Enter your choice (1-{len(EXAMPLES)}): ").strip()
     
-    if choice == "1":
-        example_wells_fargo_edge_automation()
-    elif choice == "2":
-        example_calculator_automation()
-    elif choice == "3":
-        example_notepad_with_special_keys()
-    elif choice == "4":
-        example_file_explorer_automation()
-    elif choice == "5":
-        example_custom_configuration()
-    elif choice == "6":
-        example_analytics_demonstration()
+    if choice in EXAMPLES:
+        EXAMPLES[choice][1]()
     else:
-        print("Invalid choice. Please run again and select 1-6.")
\ No newline at end of file
+        print(f"Invalid choice. Please run again and select 1-{len(EXAMPLES)}.")